@@ -1,77 +1,126 @@
+import time
+
+PROCESS_START = time.time()
+
 import os
+import ntpath
 import sqlite3
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from passlib.context import CryptContext
 import jwt
 from datetime import datetime, timedelta
-import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 load_dotenv()
 
+import storage
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB = os.path.join(BASE_DIR, "records.db")
-AUDIO_DIR = os.path.join(BASE_DIR, "audio")
+DB = storage.DB
+AUDIO_DIR = os.getenv("AUDIO_DIR", os.path.join(BASE_DIR, "audio"))
 os.makedirs(AUDIO_DIR, exist_ok=True)
 
-def init_db():
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS sessions (
-            id TEXT PRIMARY KEY,
-            patient_id TEXT,
-            transcript TEXT,
-            summary TEXT,
-            audio_file TEXT,
-            timestamp INTEGER,
-            status TEXT
-        )
-    """)
-    c.execute("""
-CREATE TABLE IF NOT EXISTS users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    email TEXT UNIQUE,
-    password TEXT,
-    role TEXT,
-    failed_attempts INTEGER DEFAULT 0,
-    locked_until INTEGER DEFAULT 0,
-    verified INTEGER DEFAULT 0
-)
-""")
-    c.execute("""
-CREATE TABLE IF NOT EXISTS audit_logs (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_email TEXT,
-    action TEXT,
-    patient_id TEXT,
-    session_id TEXT,
-    timestamp INTEGER
-)
-""")
-
-
+# uploads are spooled here (same filesystem as AUDIO_DIR) while in flight
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR", os.path.join(BASE_DIR, "data", "uploads"))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "200")) * 1024 * 1024
+MAX_AUDIO_SECONDS = int(os.getenv("MAX_AUDIO_SECONDS", "3600"))
 
-    conn.commit()
-    conn.close()
+# resumable uploads keep their received chunks here until completed
+PARTIAL_DIR = os.path.join(AUDIO_DIR, "partial")
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_KB", "1024")) * 1024
+UPLOAD_MAX_CHUNK_BYTES = int(os.getenv("UPLOAD_MAX_CHUNK_KB", "8192")) * 1024
+UPLOAD_TTL_SECONDS = int(os.getenv("UPLOAD_TTL_HOURS", "24")) * 3600
 
-init_db()
-print("DB INITIALIZED AT:", DB)
 
-
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, WebSocket, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from faster_whisper import WhisperModel
-import sqlite3
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 import uuid
-import time
-import os
-import subprocess
-import torch
+import base64
+import asyncio
+from jobs import WorkerPool, QueueFull
+from streaming import StreamingTranscriber
+from summaries import SummaryRunner, FAILED_SUMMARY
+from llm import OllamaClient, LLMError
+from cache import LRUCache, transcript_key, summary_key
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+import ingest
+from delivery import StreamLimiter, serve_file
+from delivery import version_etag, etag_matches, cache_headers, json_response
+from compression import CompressionMiddleware
+from models import ModelRegistry, ModelRouter
+from llm import LLMTimeout
+import metrics
+from audit import AuditWriter
+from hashing import PasswordHasher, HasherBusy
+from mailer import Mailer
+from auth import TokenVerifier, InvalidToken
+from uploads import ResumableUploads, ChunkRejected, UPLOADING, TRANSCRIBING, FAILED
+from segments import pack as pack_segments, unpack as unpack_segments
+from segments import from_whisper, diarize, locate
+from retention import RetentionManager, parse_policies
+from db import Database
+from repositories import SessionRepository, UserRepository, AuditRepository, write_session
+
+# async routes reach SQLite through these (one writer thread, DB_READERS
+# reader threads), so the event loop never blocks on a query
+db = Database(readers=int(os.getenv("DB_READERS", "4")))
+sessions = SessionRepository(db, hidden_statuses=(UPLOADING, TRANSCRIBING))
+users = UserRepository(db)
+audit_logs = AuditRepository(db)
+
+startup_timings = {}
+
+
+def report_cold_start():
+    startup_timings["ready_seconds"] = round(time.time() - PROCESS_START, 3)
+    print("Cold start:", {**startup_timings, **models.timings})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # heavy work happens here, not at import, so workers start listening fast
+    start = time.time()
+    storage.init_db()
+    print("DB INITIALIZED AT:", DB)
+    db.start()
+    tokens.start()
+    swept = ingest.sweep(UPLOAD_TMP_DIR)
+    if swept:
+        print("Removed stale upload spool files:", swept)
+    audit.start()
+    mailer.start()
+
+    models.resolve_device()
+    models.preload(on_ready=report_cold_start)
+    uploads.start()
+    transcriber.start()
+    summarizer.start()
+    retention.start()
+
+    startup_timings["import_seconds"] = round(IMPORT_DONE - PROCESS_START, 3)
+    startup_timings["startup_seconds"] = round(time.time() - start, 3)
+    print("Whisper using:", models.device, "workers:", WHISPER_WORKERS)
 
-app = FastAPI()
+    try:
+        yield
+    finally:
+        retention.stop()
+        uploads.stop()
+        transcriber.stop()
+        summarizer.stop()
+        llm.close()
+        audit.stop()
+        mailer.stop()
+        hasher.shutdown()
+        tokens.stop()
+        db.stop()
+        storage.close_conn()
+
+
+app = FastAPI(lifespan=lifespan)
 SECRET_KEY = os.getenv("SECRET_KEY")
 if not SECRET_KEY:
     raise RuntimeError("SECRET_KEY not set in environment")
@@ -79,8 +128,68 @@ if not SECRET_KEY:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", "64"))
+
+# bcrypt runs on its own bounded pool, never on the event loop
+hasher = PasswordHasher(
+    rounds=BCRYPT_ROUNDS,
+    workers=HASH_WORKERS,
+    max_pending=HASH_MAX_PENDING
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
+
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+# decoded claims are cached by token hash so jwt.decode isn't paid per request
+tokens = TokenVerifier(
+    SECRET_KEY,
+    ALGORITHM,
+    ttl=AUTH_CACHE_TTL,
+    max_entries=AUTH_CACHE_SIZE
+)
+
+class UploadLimitMiddleware:
+    """
+    Refuses oversized uploads from the Content-Length header, before the
+    body is read. Plain ASGI (not @app.middleware), so responses pass
+    through as-is instead of being re-streamed by BaseHTTPMiddleware.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            limit = None
+            if scope["method"] == "POST" and scope["path"].startswith("/transcribe"):
+                limit = MAX_UPLOAD_BYTES
+            elif scope["method"] == "PUT" and scope["path"].startswith("/uploads/"):
+                limit = UPLOAD_MAX_CHUNK_BYTES
+
+            length = Headers(scope=scope).get("content-length")
+            if limit and length and length.isdigit() and int(length) > limit:
+                response = JSONResponse({"detail": "Upload too large"}, status_code=413)
+                return await response(scope, receive, send)
+
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(UploadLimitMiddleware)
+
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+
+# history and summary JSON goes out gzip/brotli encoded above the threshold
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESS_MIN_BYTES,
+    gzip_level=int(os.getenv("GZIP_LEVEL", "6")),
+    brotli_quality=int(os.getenv("BROTLI_QUALITY", "4"))
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -91,39 +200,145 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Content-Range", "Accept-Ranges", "ETag"],
 )
 
 
+# ---------- METRICS ----------
+
+UPLOAD_SECONDS = metrics.Histogram(
+    "dictation_upload_receive_seconds", "Time to receive an uploaded recording")
+DIARIZE_SECONDS = metrics.Histogram(
+    "dictation_diarize_seconds", "Speaker labelling time per recording")
+AUDIO_WRITE_SECONDS = metrics.Histogram(
+    "dictation_audio_write_seconds", "Time to decode an upload and write the playback copy")
+WHISPER_SECONDS = metrics.Histogram(
+    "dictation_whisper_decode_seconds", "Whisper decode time per recording")
+WHISPER_RTF = metrics.Histogram(
+    "dictation_whisper_realtime_factor", "Whisper decode time divided by audio duration",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5))
+DB_WRITE_SECONDS = metrics.Histogram(
+    "dictation_db_write_seconds", "SQLite write latency by operation",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5))
+LLM_SECONDS = metrics.Histogram(
+    "dictation_llm_summary_seconds", "LLM summary generation time")
+QUEUE_WAIT_SECONDS = metrics.Histogram(
+    "dictation_queue_wait_seconds", "Time a job waited before a worker picked it up")
+OLLAMA_FAILURES = metrics.Counter(
+    "dictation_ollama_failures_total", "Failed Ollama calls by reason")
+SUMMARY_REQUESTS = metrics.Counter(
+    "dictation_summary_requests_total", "Summary requests by returned status")
+JOBS_IN_FLIGHT = metrics.Gauge(
+    "dictation_jobs_in_flight", "Jobs currently being processed")
+
 # ---------- WHISPER ----------
 
-device = "cuda" if torch.cuda.is_available() else "cpu"
-compute = "float16" if device == "cuda" else "int8"
+WHISPER_MODEL = "small"
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", "1"))
+WHISPER_QUEUE_SIZE = int(os.getenv("WHISPER_QUEUE_SIZE", "8"))
+WHISPER_MODELS = os.getenv("WHISPER_MODELS", "tiny,base,small,medium").split(",")
+WHISPER_MEMORY_MB = int(os.getenv("WHISPER_MEMORY_MB", "3072"))
+
+# word timings roughly double decode cost, so they're opt-in
+WORD_TIMESTAMPS = os.getenv("WHISPER_WORD_TIMESTAMPS", "0") == "1"
+# doctor/patient speaker labels come from an unvalidated clustering
+# heuristic, so they're opt-in too
+DIARIZE = os.getenv("DIARIZE", "0") == "1"
+
+# default model loads in the background at startup; every model is shared by all workers
+models = ModelRegistry(
+    WHISPER_MODEL,
+    num_workers=WHISPER_WORKERS,
+    memory_mb=WHISPER_MEMORY_MB
+)
+router = ModelRouter(models, allowed=WHISPER_MODELS, max_queue=WHISPER_QUEUE_SIZE)
+
+# jobs beyond the queue size get a 429
+transcriber = WorkerPool(
+    workers=WHISPER_WORKERS,
+    max_queue=WHISPER_QUEUE_SIZE,
+    on_start=lambda job: QUEUE_WAIT_SECONDS.observe(
+        job.started - job.created, queue="transcription"
+    )
+)
+
+metrics.Callback(
+    "dictation_queue_depth", "Jobs waiting in the transcription queue",
+    "gauge", transcriber.depth
+)
+
+# ---------- CACHE ----------
+
+CACHE_MAX_MB = int(os.getenv("CACHE_MAX_MB", "64"))
 
-whisper = WhisperModel("small", device=device, compute_type=compute)
+# keyed by audio sha256 + model + compute type
+transcript_cache = LRUCache(CACHE_MAX_MB * 1024 * 1024 // 2)
+# keyed by transcript + prompt template + LLM model
+summary_cache = LRUCache(CACHE_MAX_MB * 1024 * 1024 // 2)
 
-print("Whisper using:", device)
+def cache_counter(field):
+    return lambda: {
+        (("cache", "transcripts"),): transcript_cache.stats()[field],
+        (("cache", "summaries"),): summary_cache.stats()[field]
+    }
+
+metrics.Callback("dictation_cache_hits_total", "Cache hits", "counter", cache_counter("hits"))
+metrics.Callback("dictation_cache_misses_total", "Cache misses", "counter", cache_counter("misses"))
+metrics.Callback("dictation_cache_evictions_total", "Cache evictions", "counter", cache_counter("evictions"))
 
 # ---------- SUMMARY ----------
 
-def summarize(text):
-    try:
-        prompt = f"Convert to clinical SOAP notes:\n{text}"
-
-        r = subprocess.run(
-            ["ollama", "run", "phi3:mini"],
-            input=prompt.encode("utf-8"),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=60,
-            shell=True  # keep this on Windows
-        )
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "1"))
+SUMMARY_LEASE_SECONDS = int(os.getenv("SUMMARY_LEASE_SECONDS", "180"))
+SUMMARY_MAX_ATTEMPTS = int(os.getenv("SUMMARY_MAX_ATTEMPTS", "3"))
+SUMMARY_WAIT_MAX = 30
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://127.0.0.1:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "phi3:mini")
+OLLAMA_TIMEOUT = int(os.getenv("OLLAMA_TIMEOUT", "60"))
+OLLAMA_CONCURRENCY = int(os.getenv("OLLAMA_CONCURRENCY", "2"))
+
+llm = OllamaClient(
+    OLLAMA_URL,
+    model=OLLAMA_MODEL,
+    timeout=OLLAMA_TIMEOUT,
+    max_concurrency=OLLAMA_CONCURRENCY
+)
 
-        out = r.stdout.decode("utf-8", errors="ignore").strip()
-        return out if out else "Summary unavailable."
+SUMMARY_PROMPT = "Convert to clinical SOAP notes:\n{text}"
+
+def run_summary(text):
+    key = summary_key(text, SUMMARY_PROMPT, OLLAMA_MODEL)
+    cached = summary_cache.get(key)
+    if cached:
+        return cached
+
+    try:
+        with JOBS_IN_FLIGHT.track(kind="summary"), LLM_SECONDS.time(model=OLLAMA_MODEL):
+            out = llm.generate(SUMMARY_PROMPT.format(text=text))
+    except LLMTimeout:
+        OLLAMA_FAILURES.inc(reason="timeout")
+        raise
+    except LLMError:
+        OLLAMA_FAILURES.inc(reason="error")
+        raise
+
+    if not out:
+        OLLAMA_FAILURES.inc(reason="empty")
+        raise LLMError("empty response")
+
+    summary_cache.put(key, out)
+    return out
+
+
+summarizer = SummaryRunner(
+    run_summary,
+    workers=SUMMARY_WORKERS,
+    lease_seconds=SUMMARY_LEASE_SECONDS,
+    max_attempts=SUMMARY_MAX_ATTEMPTS,
+    on_claim=lambda wait: QUEUE_WAIT_SECONDS.observe(wait, queue="summary")
+)
 
-    except Exception as e:
-        print("Ollama error:", e)
-        return "Summary unavailable."
 
 
 # ---------- ROUTES ----------
@@ -132,11 +347,25 @@ from password_validator import PasswordValidator
 password_schema = PasswordValidator()
 password_schema.min(8).has().uppercase().has().lowercase().has().digits().has().symbols()
 
-def hash_password(password):
-    return pwd_context.hash(password)
+async def hash_password(password):
+    try:
+        return await hasher.hash(password)
+    except HasherBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, please retry.",
+            headers={"Retry-After": "1"}
+        )
 
-def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
+async def verify_password(plain, hashed):
+    try:
+        return await hasher.verify(plain, hashed)
+    except HasherBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, please retry.",
+            headers={"Retry-After": "1"}
+        )
 
 def create_token(data: dict):
     to_encode = data.copy()
@@ -165,40 +394,45 @@ def create_reset_token(email: str):
     )
 
 
-def log_action(user_email, action, patient_id=None, session_id=None):
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
-
-    c.execute(
-        "INSERT INTO audit_logs (user_email, action, patient_id, session_id, timestamp) VALUES (?,?,?,?,?)",
-        (
-            user_email,
-            action,
-            patient_id,
-            session_id,
-            int(time.time())
-        )
-    )
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "1.0"))
+
+# buffered, batched audit writes; journalled under data/audit until committed
+audit = AuditWriter(
+    os.getenv("AUDIT_JOURNAL_DIR", os.path.join(BASE_DIR, "data", "audit")),
+    batch_size=AUDIT_BATCH_SIZE,
+    flush_interval=AUDIT_FLUSH_SECONDS,
+    on_flush=lambda n, secs: DB_WRITE_SECONDS.observe(secs, op="audit_batch")
+)
+
+metrics.Callback(
+    "dictation_audit_buffered", "Audit events waiting to be flushed",
+    "gauge", audit.pending
+)
 
-    conn.commit()
-    conn.close()
 
+def log_action(user_email, action, patient_id=None, session_id=None):
+    audit.log(user_email, action, patient_id, session_id)
 
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 
 EMAIL_USER = os.getenv("EMAIL_USER")
 EMAIL_PASS = os.getenv("EMAIL_PASS")
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+
+# queued and sent from one background thread over a reused connection
+mailer = Mailer(
+    SMTP_HOST,
+    SMTP_PORT,
+    user=EMAIL_USER,
+    password=EMAIL_PASS,
+    starttls=SMTP_STARTTLS
+)
 
 def send_verification_email(to_email, token):
     verification_link = f"http://127.0.0.1:8000/verify/{token}"
 
-    message = MIMEMultipart()
-    message["From"] = EMAIL_USER
-    message["To"] = to_email
-    message["Subject"] = "Verify Your Clinical App Account"
-
     body = f"""
     Welcome to Clinical Dictation System.
 
@@ -209,26 +443,11 @@ def send_verification_email(to_email, token):
     This link expires in 24 hours.
     """
 
-    message.attach(MIMEText(body, "plain"))
-
-    try:
-        server = smtplib.SMTP("smtp.gmail.com", 587)
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASS)
-        server.sendmail(EMAIL_USER, to_email, message.as_string())
-        server.quit()
-        print("Verification email sent to", to_email)
-    except Exception as e:
-        print("Email sending failed:", e)
+    mailer.send(to_email, "Verify Your Clinical App Account", body)
 
 def send_reset_email(to_email, token):
     reset_link = f"http://127.0.0.1:5173/reset/{token}"
 
-    message = MIMEMultipart()
-    message["From"] = EMAIL_USER
-    message["To"] = to_email
-    message["Subject"] = "Reset Your Clinical App Password"
-
     body = f"""
 You requested a password reset.
 
@@ -239,192 +458,827 @@ Click the link below to set a new password:
 This link expires in 1 hour.
 """
 
-    message.attach(MIMEText(body, "plain"))
+    mailer.send(to_email, "Reset Your Clinical App Password", body)
+
+
+def get_current_user(token: str = Depends(oauth2_scheme)):
+    try:
+        return tokens.verify(token)
+    except InvalidToken:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+def get_media_user(
+    header_token: str = Depends(optional_oauth2_scheme),
+    token: str = Query(None)
+):
+    """<audio> elements can't send headers, so media also accepts ?token=."""
+    if not (header_token or token):
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return get_current_user(header_token or token)
+
+
+def save_session(sid, patient_id, transcript, audio_path, samples=None, segments=None):
+    # worker threads only; the websocket route uses sessions.save_transcript
+    with DB_WRITE_SECONDS.time(op="session_insert"):
+        write_session(
+            sid, patient_id, transcript, audio_path,
+            samples / ingest.SAMPLE_RATE if samples is not None else None,
+            samples, segments
+        )
+    summarizer.notify()
+
+
+def transcription_job(sid, upload, patient_id, user_email, quality=None):
+    def run():
+        try:
+            with JOBS_IN_FLIGHT.track(kind="transcription"):
+                return transcribe_upload()
+        except Exception:
+            # a resumable upload already has a row in 'transcribing'
+            uploads.fail(sid)
+            raise
+        finally:
+            upload.discard()
+
+    def transcribe_upload():
+        # decode once: PCM goes straight to Whisper, Opus copy to disk
+        with AUDIO_WRITE_SECONDS.time():
+            pcm, audio_file = ingest.store(upload.path, AUDIO_DIR, sid, MAX_AUDIO_SECONDS)
+
+        duration = len(pcm) / ingest.SAMPLE_RATE
+        spec = router.choose(duration, transcriber.depth(), quality)
+        label = "/".join(spec)
+
+        with models.use(spec) as model:
+            start = time.perf_counter()
+            segments, _ = model.transcribe(pcm, word_timestamps=WORD_TIMESTAMPS)
+            segs, words = from_whisper(segments, WORD_TIMESTAMPS)
+            elapsed = time.perf_counter() - start
+
+        WHISPER_SECONDS.observe(elapsed, model=label)
+        if duration:
+            WHISPER_RTF.observe(elapsed / duration, model=label)
+
+        if DIARIZE:
+            with DIARIZE_SECONDS.time():
+                diarize(pcm, segs)
+        index = pack_segments(segs, words)
+
+        transcript = "".join(s["text"] for s in segs).strip()
+        if not transcript:
+            transcript = "No speech detected."
+
+        save_session(sid, patient_id, transcript, audio_file, len(pcm), index)
+        log_action(user_email, "transcription_created", patient_id, sid)
+
+        transcript_cache.put(transcript_key(upload.sha256, *spec), {
+            "id": sid,
+            "patient_id": patient_id,
+            "user": user_email,
+            "transcript": transcript,
+            "segments": index
+        })
+
+        return {
+            "id": sid,
+            "transcript": transcript,
+            "model": label
+        }
+
+    return run
+
+
+def cached_transcription(hit, upload, patient_id, user, sid=None):
+    meta = {"user": user["sub"]}
+
+    # client retry of the same upload: hand back the session it already has
+    if sid is None and hit["patient_id"] == patient_id and hit["user"] == user["sub"]:
+        exists = storage.query_one("SELECT 1 FROM sessions WHERE id=?", (hit["id"],))
+        if exists:
+            return transcriber.completed(
+                {"id": hit["id"], "transcript": hit["transcript"]},
+                job_id=hit["id"],
+                meta=meta
+            )
+
+    # same recording filed again: new session, but skip Whisper
+    sid = sid or str(uuid.uuid4())
+    pcm, audio_file = ingest.store(upload.path, AUDIO_DIR, sid, MAX_AUDIO_SECONDS)
 
+    save_session(sid, patient_id, hit["transcript"], audio_file, len(pcm), hit.get("segments"))
+    log_action(user["sub"], "transcription_created", patient_id, sid)
+
+    return transcriber.completed(
+        {"id": sid, "transcript": hit["transcript"]},
+        job_id=sid,
+        meta=meta
+    )
+
+
+def upload_rejected(e):
+    if isinstance(e, ingest.UploadTooLarge):
+        detail = f"Upload too large (max {MAX_UPLOAD_BYTES // (1024 * 1024)} MB)"
+    else:
+        detail = f"Recording too long (max {MAX_AUDIO_SECONDS} seconds)"
+    return HTTPException(status_code=413, detail=detail)
+
+
+async def receive_upload(audio):
+    """Spool the upload to disk in chunks and reject it early if it's too big."""
     try:
-        server = smtplib.SMTP("smtp.gmail.com", 587)
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASS)
-        server.sendmail(EMAIL_USER, to_email, message.as_string())
-        server.quit()
-        print("Reset email sent to", to_email)
-    except Exception as e:
-        print("Reset email failed:", e)
+        with UPLOAD_SECONDS.time():
+            upload = await ingest.spool(audio, UPLOAD_TMP_DIR, MAX_UPLOAD_BYTES)
+    except ingest.UploadTooLarge as e:
+        raise upload_rejected(e)
 
+    try:
+        await run_in_threadpool(ingest.check_duration, upload.path, MAX_AUDIO_SECONDS)
+    except ingest.UploadTooLong as e:
+        upload.discard()
+        raise upload_rejected(e)
+
+    return upload
+
+
+async def submit_transcription(audio, patient_id, user, quality=None):
+    upload = await receive_upload(audio)
+    return await queue_transcription(upload, patient_id, user, quality)
+
+
+async def queue_transcription(upload, patient_id, user, quality=None, sid=None):
+    """Hand a spooled upload to Whisper, or answer from the transcript cache."""
+    # results are looked up under the model an idle node would pick, so a
+    # transcript produced by a load-shed smaller model isn't reused later
+    hit = transcript_cache.get(transcript_key(upload.sha256, *router.preferred(quality)))
+    if hit:
+        try:
+            return await run_in_threadpool(
+                cached_transcription, hit, upload, patient_id, user, sid
+            )
+        except ingest.UploadTooLong as e:
+            raise upload_rejected(e)
+        finally:
+            upload.discard()
+
+    resumable = sid is not None
+    sid = sid or str(uuid.uuid4())
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    except:
-        raise HTTPException(401, "Invalid token")
+        return transcriber.submit(
+            transcription_job(sid, upload, patient_id, user["sub"], quality),
+            job_id=sid,
+            meta={"user": user["sub"]}
+        )
+    except QueueFull:
+        upload.discard()
+        if resumable:
+            # the chunks are still on disk: a retried complete re-assembles them
+            await run_in_threadpool(uploads.release, sid)
+        raise HTTPException(
+            status_code=429,
+            detail="Transcription queue is full, try again shortly.",
+            headers={"Retry-After": "5"}
+        )
+
+
+def get_job(job_id, user):
+    job = transcriber.get(job_id)
+    if not job or job.meta.get("user") != user["sub"]:
+        raise HTTPException(404, "Job not found")
+    return job
+
+
+async def completed_upload(upload_id, user):
+    """
+    Job info for an upload that was already completed. Job records are
+    pruned after a while; past that the session row still has the outcome.
+    """
+    job = transcriber.get(upload_id)
+    if job:
+        if job.meta.get("user") != user["sub"]:
+            raise HTTPException(404, "Job not found")
+        return {**job.info(), "queue_depth": transcriber.depth()}
+
+    row = await sessions.get(upload_id, full=False)
+    if not row or row[4] == UPLOADING:
+        raise HTTPException(404, "Job not found")
+
+    # a failed summary is 'failed' too, but by then the audio is stored
+    failed = row[4] == FAILED and not row[2]
+    return {
+        "job_id": upload_id,
+        "status": "running" if row[4] == TRANSCRIBING else "error" if failed else "done",
+        "error": "Transcription failed" if failed else None,
+        "created": row[3],
+        "started": None,
+        "finished": None,
+        "queue_depth": transcriber.depth()
+    }
 
 
 @app.post("/transcribe")
 async def transcribe(
     audio: UploadFile = File(...),
     patient_id: str = Form(...),
+    quality: str = Form(None, pattern="^(fast|balanced|accurate)$"),
     user = Depends(get_current_user)
 ):
-    sid = str(uuid.uuid4())
-    audio_path = f"{AUDIO_DIR}/{sid}.webm"
-
-    with open(audio_path, "wb") as f:
-        f.write(await audio.read())
-
-    segments, _ = whisper.transcribe(audio_path)
-    transcript = "".join([s.text for s in segments]).strip()
-
-    if not transcript:
-        transcript = "No speech detected."
-
-    # ✅ Save session with EMPTY summary + pending status
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO sessions VALUES (?,?,?,?,?,?,?)",
-        (
-            sid,
-            patient_id,
-            transcript,
-            "",                 # summary empty
-            audio_path,
-            int(time.time()),
-            "pending"           # 👈 THIS IS CRITICAL
+    job = await submit_transcription(audio, patient_id, user, quality)
+
+    # wait without holding the event loop
+    try:
+        return await asyncio.wrap_future(job.future)
+    except ingest.UploadTooLong as e:
+        raise upload_rejected(e)
+
+
+@app.post("/transcribe/jobs", status_code=202)
+async def submit_transcribe_job(
+    audio: UploadFile = File(...),
+    patient_id: str = Form(...),
+    quality: str = Form(None, pattern="^(fast|balanced|accurate)$"),
+    user = Depends(get_current_user)
+):
+    job = await submit_transcription(audio, patient_id, user, quality)
+    return {**job.info(), "queue_depth": transcriber.depth()}
+
+
+@app.get("/transcribe/jobs/{job_id}")
+def transcribe_job_status(job_id: str, user = Depends(get_current_user)):
+    job = get_job(job_id, user)
+    return {**job.info(), "queue_depth": transcriber.depth()}
+
+
+@app.get("/transcribe/jobs/{job_id}/result")
+def transcribe_job_result(job_id: str, user = Depends(get_current_user)):
+    job = get_job(job_id, user)
+
+    if job.status == "error":
+        raise HTTPException(500, f"Transcription failed: {job.error}")
+
+    if job.status != "done":
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job is {job.status}",
+            headers={"Retry-After": "2"}
         )
+
+    return job.future.result()
+
+
+# ---------- RESUMABLE UPLOADS ----------
+
+uploads = ResumableUploads(
+    PARTIAL_DIR,
+    UPLOAD_TMP_DIR,
+    MAX_UPLOAD_BYTES,
+    chunk_size=UPLOAD_CHUNK_BYTES,
+    max_chunk_size=UPLOAD_MAX_CHUNK_BYTES,
+    ttl=UPLOAD_TTL_SECONDS
+)
+
+
+def get_upload(upload_id, user):
+    manifest = uploads.manifest(upload_id, user["sub"])
+    if not manifest:
+        raise HTTPException(404, "Upload not found or expired")
+    return manifest
+
+
+@app.post("/uploads", status_code=201)
+def create_upload(
+    patient_id: str = Form(...),
+    size: int = Form(...),
+    chunk_size: int = Form(None),
+    quality: str = Form(None, pattern="^(fast|balanced|accurate)$"),
+    user = Depends(get_current_user)
+):
+    """
+    Start a resumable upload of `size` bytes. The client then PUTs chunks
+    0..chunks-1 to /uploads/{id}/chunks/{n} with an X-Chunk-SHA256 header,
+    checks GET /uploads/{id} after a dropped connection, and calls
+    POST /uploads/{id}/complete to start transcription.
+    """
+    try:
+        manifest = uploads.create(patient_id, user["sub"], size, chunk_size, quality)
+    except ingest.UploadTooLarge as e:
+        raise upload_rejected(e)
+    except ChunkRejected as e:
+        raise HTTPException(400, str(e))
+
+    log_action(user["sub"], "upload_started", patient_id, manifest["id"])
+    return uploads.status(manifest)
+
+
+@app.get("/uploads/{upload_id}")
+def upload_status(upload_id: str, user = Depends(get_current_user)):
+    return uploads.status(get_upload(upload_id, user))
+
+
+@app.put("/uploads/{upload_id}/chunks/{index}")
+async def put_upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    user = Depends(get_current_user)
+):
+    manifest = await run_in_threadpool(get_upload, upload_id, user)
+
+    checksum = request.headers.get("x-chunk-sha256")
+    if not checksum:
+        raise HTTPException(400, "X-Chunk-SHA256 header required")
+
+    body = bytearray()
+    async for part in request.stream():
+        body += part
+        if len(body) > manifest["chunk_size"]:
+            raise HTTPException(413, "Chunk larger than the upload's chunk_size")
+
+    try:
+        await run_in_threadpool(uploads.put_chunk, manifest, index, bytes(body), checksum)
+    except ChunkRejected as e:
+        raise HTTPException(400, str(e))
+
+    return {"id": upload_id, "index": index, "stored": True}
+
+
+@app.post("/uploads/{upload_id}/complete", status_code=202)
+async def complete_upload(
+    upload_id: str,
+    sha256: str = Form(None),
+    user = Depends(get_current_user)
+):
+    manifest = await run_in_threadpool(uploads.manifest, upload_id, user["sub"])
+    if not manifest:
+        # already completed: a retried request gets the existing job
+        return await completed_upload(upload_id, user)
+
+    try:
+        upload = await run_in_threadpool(uploads.assemble, manifest, sha256)
+    except ChunkRejected as e:
+        raise HTTPException(409, str(e))
+
+    if upload is None:
+        return await completed_upload(upload_id, user)
+
+    try:
+        await run_in_threadpool(ingest.check_duration, upload.path, MAX_AUDIO_SECONDS)
+    except ingest.UploadTooLong as e:
+        upload.discard()
+        await run_in_threadpool(uploads.abort, upload_id)
+        raise upload_rejected(e)
+
+    job = await queue_transcription(
+        upload, manifest["patient_id"], user, manifest["quality"], sid=upload_id
     )
-    conn.commit()
-    conn.close()
+    await run_in_threadpool(uploads.finish, upload_id)
+    return {**job.info(), "queue_depth": transcriber.depth()}
 
-    log_action(user["sub"], "transcription_created", patient_id, sid)
 
+@app.delete("/uploads/{upload_id}")
+def abort_upload(upload_id: str, user = Depends(get_current_user)):
+    get_upload(upload_id, user)
+    uploads.abort(upload_id)
+    return {"status": "aborted"}
+
+
+@app.websocket("/ws/transcribe")
+async def transcribe_stream(
+    websocket: WebSocket,
+    token: str = Query(...),
+    patient_id: str = Query(...)
+):
+    """
+    Live dictation: the client sends binary webm chunks while recording and
+    a "stop" text frame when done. Segments are pushed back as
+    {"type": "segment", ...} and the saved session as {"type": "final", ...}.
+    """
+    try:
+        # a cache miss decodes the JWT; keep that off the event loop
+        user = await run_in_threadpool(get_current_user, token)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+
+    sid = str(uuid.uuid4())
+    audio_path = os.path.join(AUDIO_DIR, f"{sid}.webm")
+    stream = StreamingTranscriber(audio_path)
+
+    loop = asyncio.get_running_loop()
+    outbox = asyncio.Queue()
+
+    def emit(seg):
+        loop.call_soon_threadsafe(outbox.put_nowait, {"type": "segment", **seg})
+
+    async def sender():
+        while True:
+            msg = await outbox.get()
+            if msg is None:
+                break
+            try:
+                await websocket.send_json(msg)
+            except Exception:
+                # client went away, keep draining so the stream can finish
+                pass
+
+    async def decode(final=False):
+        while True:
+            try:
+                job = transcriber.submit(
+                    lambda: stream.step(models.get(), emit, final)
+                )
+                break
+            except QueueFull:
+                if not final:
+                    return
+                await asyncio.sleep(1)
+        await asyncio.wrap_future(job.future)
+
+    send_task = asyncio.create_task(sender())
+    step = None
+    saved = False
+
+    try:
+        while True:
+            msg = await websocket.receive()
+
+            if msg["type"] == "websocket.disconnect":
+                break
+
+            if msg.get("bytes"):
+                stream.append(msg["bytes"])
+                if (step is None or step.done()) and stream.due():
+                    step = asyncio.create_task(decode())
+
+            elif msg.get("text") == "stop":
+                break
+
+        if step:
+            await step
+        await decode(final=True)
+
+        if not stream.received:
+            await outbox.put({"type": "error", "detail": "No audio received"})
+            return
+
+        transcript = stream.text() or "No speech detected."
+        with DB_WRITE_SECONDS.time(op="session_insert"):
+            await sessions.save_transcript(
+                sid, patient_id, transcript, os.path.basename(audio_path),
+                stream.committed / ingest.SAMPLE_RATE, stream.committed,
+                pack_segments(stream.segments)
+            )
+        saved = True
+        summarizer.notify()
+        log_action(user["sub"], "transcription_created", patient_id, sid)
+
+        await outbox.put({"type": "final", "id": sid, "transcript": transcript})
+
+    except Exception as e:
+        print("Stream error:", e)
+        await outbox.put({"type": "error", "detail": "Transcription failed"})
+
+    finally:
+        # no session refers to the spooled recording unless it was saved
+        if saved:
+            stream.close()
+        else:
+            stream.discard()
+        await outbox.put(None)
+        await send_task
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+
+def summary_response(status, summary):
+    SUMMARY_REQUESTS.inc(status=status)
+    if status == "done" and summary:
+        return {"summary": summary, "status": status}
+    if status == "failed":
+        return {"summary": summary or FAILED_SUMMARY, "status": status}
+    return {"summary": "Summarizing...", "status": status}
+
+
+@app.get("/cache/stats")
+def cache_stats(user = Depends(get_current_user)):
     return {
-        "id": sid,
-        "transcript": transcript
+        "transcripts": transcript_cache.stats(),
+        "summaries": summary_cache.stats(),
+        "tokens": tokens.stats()
     }
 
+
 @app.get("/summary/{sid}")
-def generate_summary(sid: str):
+async def generate_summary(
+    sid: str,
+    request: Request,
+    wait: int = 0,
     user = Depends(get_current_user)
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
+):
+    """
+    Summaries are produced in the background after /transcribe. Clients
+    either poll, or pass wait=N to hold the request open (up to 30s)
+    until the summary is ready.
+    """
+    waiter = summarizer.subscribe(sid) if wait > 0 else None
 
-    row = c.execute(
-        "SELECT transcript, summary, status FROM sessions WHERE id=?",
-        (sid,)
-    ).fetchone()
+    row = await sessions.summary_state(sid)
 
     if not row:
-        conn.close()
+        if waiter:
+            summarizer.unsubscribe(sid, waiter)
         return {"summary": "Session not found."}
 
-    transcript, summary, status = row
+    summary, status, version = row
+    # pollers send the tag back and get a bodiless 304 until the row changes
+    etag = version_etag("summary", sid, version)
 
-    if status == "done" and summary:
-        conn.close()
-        return {"summary": summary}
+    if not waiter or status in ("done", "failed"):
+        if waiter:
+            summarizer.unsubscribe(sid, waiter)
+        return json_response(request, summary_response(status, summary), etag)
 
-    if status == "processing":
-        conn.close()
-        return {"summary": "Summarizing..."}
+    try:
+        result = await asyncio.wait_for(
+            asyncio.wrap_future(waiter),
+            timeout=min(wait, SUMMARY_WAIT_MAX)
+        )
+        return summary_response(result["status"], result["summary"])
+    except asyncio.TimeoutError:
+        summarizer.unsubscribe(sid, waiter)
+        return json_response(request, summary_response(status, summary), etag)
 
-    # lock
-    c.execute(
-        "UPDATE sessions SET status=? WHERE id=?",
-        ("processing", sid)
-    )
-    conn.commit()
-    conn.close()
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE = 200
 
-    summary = summarize(transcript)
+def encode_cursor(timestamp, sid):
+    return base64.urlsafe_b64encode(f"{timestamp}:{sid}".encode()).decode()
 
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
-    c.execute(
-        "UPDATE sessions SET summary=?, status=? WHERE id=?",
-        (summary, "done", sid)
-    )
-    conn.commit()
-    conn.close()
 
-    return {"summary": summary}
+def decode_cursor(cursor):
+    try:
+        ts, sid = base64.urlsafe_b64decode(cursor.encode()).decode().split(":", 1)
+        return int(ts), sid
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+
+
+def session_item(r):
+    item = {
+        "id": r[0],
+        "patient_id": r[1],
+        # older rows hold a full path, possibly with Windows separators
+        "audio": ntpath.basename(r[2]) if r[2] else r[2],
+        "timestamp": r[3],
+        "status": r[4]
+    }
+    if len(r) > 5:
+        item["transcript"] = r[5]
+        item["summary"] = r[6]
+    return item
+
+
+def next_page_header(rows, limit, ts_index):
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        return {"X-Next-Cursor": encode_cursor(last[ts_index], last[0])}
+    return {}
+
+
+async def list_sessions(request, pid="", match="prefix", cursor=None, limit=HISTORY_PAGE_SIZE, view="slim"):
+    """
+    Keyset-paginated session list, newest first; see SessionRepository.page.
+    The ETag covers the page's ids and row versions, checked before any
+    transcript text is read, so an unchanged page costs one narrow query
+    and a 304.
+    """
+    limit = max(1, min(limit, HISTORY_MAX_PAGE))
+    key = decode_cursor(cursor) if cursor else None
+
+    versions = await sessions.page_versions(pid, match, key, limit)
+    etag = version_etag(view, *(f"{r[0]}:{r[2]}" for r in versions))
+    if etag_matches(request, etag):
+        return Response(
+            status_code=304,
+            headers=cache_headers(etag, next_page_header(versions, limit, 1))
+        )
+
+    rows = await sessions.page(pid, match, cursor=key, limit=limit, full=view == "full")
+    headers = cache_headers(etag, next_page_header(rows, limit, 3))
+    return JSONResponse([session_item(r) for r in rows[:limit]], headers=headers)
+
 
 @app.get("/history/{pid}")
-def history(pid: str):
+async def history(
+    pid: str,
+    request: Request,
+    match: str = Query("prefix", pattern="^(exact|prefix)$"),
+    cursor: str = None,
+    limit: int = HISTORY_PAGE_SIZE,
+    view: str = Query("slim", pattern="^(slim|full)$"),
     user = Depends(get_current_user)
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
+):
+    return await list_sessions(request, pid, match, cursor, limit, view)
 
-    if pid == "":
-        rows = c.execute(
-            "SELECT * FROM sessions ORDER BY timestamp DESC"
-        ).fetchall()
-    else:
-        rows = c.execute(
-            "SELECT * FROM sessions WHERE patient_id LIKE ? ORDER BY timestamp DESC",
-            (f"%{pid}%",)
-        ).fetchall()
+@app.get("/history")
+async def all_history(
+    request: Request,
+    cursor: str = None,
+    limit: int = HISTORY_PAGE_SIZE,
+    view: str = Query("slim", pattern="^(slim|full)$"),
+    user = Depends(get_current_user)
+):
+    return await list_sessions(request, "", cursor=cursor, limit=limit, view=view)
 
-    conn.close()
 
-    return [
-        {
-            "id": r[0],
-            "patient_id": r[1],
-            "transcript": r[2],
-            "summary": r[3],
-            "audio": r[4],
-            "timestamp": r[5]
-        }
-        for r in rows
-    ]
+@app.get("/session/{sid}")
+async def get_session(sid: str, request: Request, user = Depends(get_current_user)):
+    version = await sessions.version(sid)
+    if version is None:
+        raise HTTPException(404, "Session not found")
 
-@app.get("/history")
-def all_history():
+    etag = version_etag("session", sid, version)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+
+    row = await sessions.get(sid)
+    if not row:
+        raise HTTPException(404, "Session not found")
+    return JSONResponse(session_item(row), headers=cache_headers(etag))
+
+
+@app.get("/session/{sid}/segments")
+async def get_segments(
+    sid: str,
+    words: bool = False,
+    at: float = None,
     user = Depends(get_current_user)
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
-    rows = c.execute(
-        "SELECT * FROM sessions ORDER BY timestamp DESC"
-    ).fetchall()
-    conn.close()
-
-    return [
-        {
-            "id": r[0],
-            "patient_id": r[1],
-            "transcript": r[2],
-            "summary": r[3],
-            "audio": r[4],
-            "timestamp": r[5]
-        }
-        for r in rows
-    ]
+):
+    """
+    Timed segments (and words, if recorded) for seeking the audio from the
+    transcript. `at=<seconds>` also returns the index of the segment
+    playing at that offset.
+    """
+    row = await sessions.segments(sid)
+    if not row:
+        raise HTTPException(404, "Session not found")
+    if row[0] is None:
+        raise HTTPException(404, "No segment index for this session")
+
+    segs, word_list = unpack_segments(row[0], with_words=words)
+    body = {"id": sid, "duration": row[1], "segments": segs}
+    if words:
+        body["words"] = word_list
+    if at is not None:
+        body["index"] = locate(segs, at)
+    return body
 
 
-@app.get("/audio/{filename}")
-def audio(filename: str):
+SEARCH_PAGE_SIZE = 20
+
+
+def fts_query(q):
+    # quote every term so user input can't inject FTS5 query syntax;
+    # the last term also matches as a prefix for search-as-you-type
+    terms = ['"' + t.replace('"', '""') + '"' for t in q.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+@app.get("/search")
+async def search(
+    q: str,
+    patient_id: str = None,
+    limit: int = SEARCH_PAGE_SIZE,
+    offset: int = 0,
     user = Depends(get_current_user)
-    return FileResponse(f"{AUDIO_DIR}/{filename}")
+):
+
+    match = fts_query(q)
+    if not match:
+        return {"results": [], "next_offset": None}
+
+    limit = max(1, min(limit, HISTORY_MAX_PAGE))
+    offset = max(0, offset)
+
+    try:
+        rows = await sessions.search(match, patient_id, limit, offset)
+    except sqlite3.OperationalError as e:
+        raise HTTPException(400, f"Invalid search query: {e}")
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "results": [
+            {
+                "id": r[0],
+                "patient_id": r[1],
+                "timestamp": r[2],
+                "status": r[3],
+                "transcript_snippet": r[4],
+                "summary_snippet": r[5],
+                "score": round(-r[6], 4)
+            }
+            for r in rows
+        ],
+        "next_offset": offset + limit if more else None
+    }
+
+
+# ---------- RETENTION ----------
+
+# policies are "status:action:days", applied in order; actions are
+# archive (into a bundle), delete_audio, delete (session and audio)
+# nothing is archived or deleted unless RETENTION_POLICIES is set
+RETENTION_POLICIES = parse_policies(os.getenv("RETENTION_POLICIES", ""))
+RETENTION_INTERVAL = int(os.getenv("RETENTION_INTERVAL_MINUTES", "60")) * 60
+RETENTION_IO_BYTES = int(float(os.getenv("RETENTION_IO_MBPS", "5")) * 1024 * 1024)
+# deleting unreferenced files in AUDIO_DIR is opt-in (ORPHAN_SWEEP=1)
+ORPHAN_GRACE = (
+    int(os.getenv("ORPHAN_GRACE_HOURS", "6")) * 3600
+    if os.getenv("ORPHAN_SWEEP", "0") == "1" else None
+)
+VACUUM_INTERVAL = int(os.getenv("VACUUM_INTERVAL_HOURS", "168")) * 3600
+# archive bundles and restored copies live under here
+RETENTION_DIR = os.getenv("RETENTION_DIR", os.path.join(BASE_DIR, "data"))
+
+retention = RetentionManager(
+    AUDIO_DIR,
+    os.getenv("AUDIO_ARCHIVE_DIR", os.path.join(RETENTION_DIR, "archive")),
+    os.path.join(RETENTION_DIR, "restored"),
+    RETENTION_POLICIES,
+    interval=RETENTION_INTERVAL,
+    orphan_grace=ORPHAN_GRACE,
+    io_bytes_per_sec=RETENTION_IO_BYTES,
+    vacuum_interval=VACUUM_INTERVAL,
+    on_delete=lambda sid: log_action("system", "session_expired", None, sid)
+)
+
+
+AUDIO_STREAMS_PER_USER = int(os.getenv("AUDIO_STREAMS_PER_USER", "4"))
+audio_streams = StreamLimiter(AUDIO_STREAMS_PER_USER)
+
+
+@app.api_route("/audio/{filename}", methods=["GET", "HEAD"])
+def audio(filename: str, request: Request, user = Depends(get_media_user)):
+    if filename != os.path.basename(filename) or filename.startswith("."):
+        raise HTTPException(404, "Audio not found")
+
+    owner = user["sub"]
+    if not audio_streams.acquire(owner):
+        raise HTTPException(
+            status_code=429,
+            detail="Too many concurrent audio streams",
+            headers={"Retry-After": "2"}
+        )
+
+    media_type = "audio/ogg" if filename.endswith(".opus") else "audio/webm"
+    if filename.endswith(".wav"):
+        media_type = "audio/wav"
+
+    try:
+        # cold recordings are restored from their archive bundle on demand
+        path = retention.locate(filename)
+    except Exception:
+        audio_streams.release(owner)
+        raise
+
+    return serve_file(
+        request,
+        path,
+        media_type=media_type,
+        on_close=lambda: audio_streams.release(owner)
+    )
 
 @app.delete("/session/{sid}")
-def delete_session(sid: str):
-    user = Depends(get_current_user)
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
-    c.execute("DELETE FROM sessions WHERE id=?", (sid,))
-    conn.commit()
-    conn.close()
+async def delete_session(sid: str, user = Depends(get_current_user)):
+    audio_file = await sessions.delete(sid)
     log_action(user["sub"], "session_deleted", None, sid)
+
+    # the recording goes too, wherever it lives (AUDIO_DIR, archive, restored copy)
+    if audio_file:
+        await run_in_threadpool(retention.remove_audio, os.path.basename(audio_file))
     return {"status": "deleted"}
 
 @app.post("/register")
-def register(email: str = Form(...), password: str = Form(...)):
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
-
+async def register(email: str = Form(...), password: str = Form(...)):
     # Password strength check
     if not password_schema.validate(password):
-        conn.close()
         raise HTTPException(
             status_code=400,
             detail="Password must be 8+ chars with uppercase, lowercase, number, and symbol"
@@ -432,58 +1286,42 @@ def register(email: str = Form(...), password: str = Form(...)):
 
     # bcrypt limit check
     if len(password.encode("utf-8")) > 72:
-        conn.close()
         raise HTTPException(
             status_code=400,
             detail="Password too long (max 72 characters)."
         )
 
-    hashed = hash_password(password)
+    hashed = await hash_password(password)
 
-    try:
-        c.execute(
-            "INSERT INTO users(email,password,role,verified) VALUES (?,?,?,?)",
-            (email, hashed, "doctor", 0)
-        )
-        conn.commit()
-
-    except:
-        conn.close()
+    if not await users.create(email, hashed, "doctor", 0):
         raise HTTPException(status_code=400, detail="User exists")
 
     # Create verification token AFTER successful insert
     token = create_verification_token(email)
     send_verification_email(email, token)
 
-    conn.close()
-
     return {
     "status": "Registration successful. Check your email to verify."
 }
 
 
 @app.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
-
-    user = c.execute(
-        "SELECT * FROM users WHERE email=?",
-        (form_data.username,)
-    ).fetchone()
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await users.by_email(form_data.username)
 
     if not user:
-        conn.close()
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     # Check password
-    if not verify_password(form_data.password, user[2]):
-        conn.close()
+    if not await verify_password(form_data.password, user[2]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # re-hash stored passwords when BCRYPT_ROUNDS changes
+    if hasher.needs_update(user[2]):
+        await users.set_password(user[1], await hash_password(form_data.password))
+
     # 🔥 FIXED VERIFICATION CHECK
     if user[6] == 0:
-        conn.close()
         raise HTTPException(
             status_code=403,
             detail="Please verify your email before logging in."
@@ -496,35 +1334,32 @@ def login(form_data: OAuth2PasswordRequestForm = Depends()):
 
     log_action(user[1], "login_success")
 
-
-    conn.close()
-
     return {
         "access_token": token,
         "token_type": "bearer"
     }
 
-@app.post("/forgot-password")
-def forgot_password(email: str = Form(...)):
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
+@app.post("/logout")
+def logout(
+    token: str = Depends(oauth2_scheme),
+    user = Depends(get_current_user)
+):
+    tokens.revoke(token)
+    log_action(user["sub"], "logout")
+    return {"status": "Logged out"}
 
-    user = c.execute(
-        "SELECT * FROM users WHERE email=?",
-        (email,)
-    ).fetchone()
 
+@app.post("/forgot-password")
+async def forgot_password(email: str = Form(...)):
     # Always return same response (security best practice)
-    if user:
+    if await users.exists(email):
         token = create_reset_token(email)
         send_reset_email(email, token)
 
-    conn.close()
-
     return {"status": "If account exists, reset email sent."}
 
 @app.post("/reset-password/{token}")
-def reset_password(token: str, new_password: str = Form(...)):
+async def reset_password(token: str, new_password: str = Form(...)):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email = payload["email"]
@@ -535,18 +1370,9 @@ def reset_password(token: str, new_password: str = Form(...)):
                 detail="Password must meet complexity requirements."
             )
 
-        hashed = hash_password(new_password)
+        hashed = await hash_password(new_password)
 
-        conn = sqlite3.connect(DB)
-        c = conn.cursor()
-
-        c.execute(
-            "UPDATE users SET password=? WHERE email=?",
-            (hashed, email)
-        )
-
-        conn.commit()
-        conn.close()
+        await users.set_password(email, hashed)
 
         return {"status": "Password reset successful"}
 
@@ -556,14 +1382,65 @@ def reset_password(token: str, new_password: str = Form(...)):
 
 
 @app.get("/audit")
-def get_audit(user=Depends(get_current_user)):
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
+async def get_audit(
+    since: int = None,
+    until: int = None,
+    cursor: str = None,
+    limit: int = HISTORY_PAGE_SIZE,
+    user=Depends(get_current_user)
+):
+    """Audit entries newest first, optionally within [since, until) (unix seconds)."""
+    limit = max(1, min(limit, HISTORY_MAX_PAGE))
+
+    cursor = decode_cursor(cursor) if cursor else None
+    if cursor:
+        # audit ids are integers; anything else is a forged or foreign cursor
+        if not cursor[1].isdigit():
+            raise HTTPException(400, "Invalid cursor")
+        cursor = (cursor[0], int(cursor[1]))
+
+    logs = await audit_logs.page(since, until, cursor, limit)
+
+    headers = {}
+    if len(logs) > limit:
+        logs = logs[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(logs[-1][5], logs[-1][0])
+
+    return JSONResponse([list(r) for r in logs], headers=headers)
+
+
+# ---------- HEALTH ----------
 
-    logs = c.execute(
-        "SELECT * FROM audit_logs ORDER BY timestamp DESC"
-    ).fetchall()
+@app.get("/metrics")
+def metrics_endpoint():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok", "uptime": round(time.time() - PROCESS_START, 1)}
+
+
+@app.get("/readyz")
+async def readyz():
+    status = models.status()
+    ready = status["ready"]
+
+    try:
+        await db.query_one("SELECT 1")
+    except Exception as e:
+        ready = False
+        status["db_error"] = str(e)
+
+    body = {
+        **status,
+        "ready": ready,
+        "queue_depth": transcriber.depth(),
+        "cold_start": {**startup_timings, **status["timings"]}
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
 
-    conn.close()
 
-    return logs
+IMPORT_DONE = time.time()
@@ -0,0 +1,170 @@
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+import storage
+
+INSERT_SQL = (
+    "INSERT OR IGNORE INTO audit_logs "
+    "(event_id, user_email, action, patient_id, session_id, timestamp) "
+    "VALUES (?,?,?,?,?,?)"
+)
+
+
+class AuditWriter:
+    """
+    Buffers audit events and writes them to audit_logs in batches.
+
+    Each event is appended to a journal file before it is buffered, so an
+    event survives a crash or a failed flush. A flush seals the current
+    journal segment, inserts the batch in one transaction and deletes the
+    segment. Segments left behind (crash, locked DB) are replayed on the
+    next flush and at startup. event_id is unique, so replaying a segment
+    that was already committed doesn't duplicate rows.
+    """
+
+    def __init__(self, journal_dir, batch_size=200, flush_interval=1.0, on_flush=None):
+        self.journal_dir = journal_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+
+        os.makedirs(journal_dir, exist_ok=True)
+        self.journal_path = os.path.join(journal_dir, "audit.journal")
+
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.flush_lock = threading.Lock()
+        self.journal = None
+        self.thread = None
+        self.stopping = False
+        self.segment = 0
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        # anything journalled by a previous process is replayed first
+        if os.path.exists(self.journal_path):
+            os.replace(self.journal_path, self._sealed_path())
+        self._replay()
+
+        self.journal = open(self.journal_path, "a", encoding="utf-8")
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.cond:
+            self.stopping = True
+            self.cond.notify()
+        if self.thread:
+            self.thread.join(timeout=10)
+        self.flush()
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+
+    # ---------- writes ----------
+
+    def log(self, user_email, action, patient_id=None, session_id=None):
+        event = (
+            uuid.uuid4().hex,
+            user_email,
+            action,
+            patient_id,
+            session_id,
+            int(time.time())
+        )
+
+        with self.cond:
+            if self.journal is None:
+                # writer not running (CLI, tests): write through
+                storage.execute(INSERT_SQL, event)
+                return
+
+            self.journal.write(json.dumps(event) + "\n")
+            self.journal.flush()
+            self.buffer.append(event)
+
+            if len(self.buffer) >= self.batch_size:
+                self.cond.notify()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.cond:
+                batch = self.buffer
+                self.buffer = []
+                sealed = None
+                if self.journal is not None and batch:
+                    self.journal.close()
+                    sealed = self._sealed_path()
+                    os.replace(self.journal_path, sealed)
+                    self.journal = open(self.journal_path, "a", encoding="utf-8")
+
+            if batch:
+                start = time.perf_counter()
+                try:
+                    storage.executemany(INSERT_SQL, batch)
+                except Exception as e:
+                    # the sealed segment stays on disk and is retried later
+                    print("Audit flush failed, kept in journal:", e)
+                    return 0
+
+                if sealed:
+                    os.remove(sealed)
+                if self.on_flush:
+                    self.on_flush(len(batch), time.perf_counter() - start)
+
+            self._replay()
+            return len(batch)
+
+    def pending(self):
+        with self.cond:
+            return len(self.buffer)
+
+    # ---------- internals ----------
+
+    def _sealed_path(self):
+        self.segment += 1
+        return os.path.join(
+            self.journal_dir, f"audit-{int(time.time() * 1000)}-{self.segment}.sealed"
+        )
+
+    def _replay(self):
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, "*.sealed"))):
+            rows = []
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rows.append(tuple(json.loads(line)))
+                    except ValueError:
+                        pass    # torn last line from a crash mid-write
+
+            try:
+                storage.executemany(INSERT_SQL, rows)
+            except Exception as e:
+                print("Audit replay failed:", path, e)
+                return
+
+            os.remove(path)
+            if rows:
+                print(f"Replayed {len(rows)} audit events from {os.path.basename(path)}")
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if not self.stopping and len(self.buffer) < self.batch_size:
+                    self.cond.wait(self.flush_interval)
+                stopping = self.stopping
+
+            if stopping:
+                break
+
+            try:
+                self.flush()
+            except Exception as e:
+                print("Audit writer error:", e)
@@ -0,0 +1,158 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+
+import storage
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def token_hash(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenVerifier:
+    """
+    JWT verification with a small cache of decoded claims.
+
+    Entries are keyed by the SHA-256 of the token (the raw token is never
+    kept) and live for `ttl` seconds or until the token's own `exp`,
+    whichever comes first, so a cached token can't outlive its signature.
+    The cache is LRU-bounded at `max_entries`.
+
+    Revoked tokens are kept by hash until they would have expired anyway,
+    in memory for the hot path and in the revoked_tokens table so other
+    workers and restarts see them. A background thread (start/stop)
+    reloads the table every `refresh` seconds and purges expired rows,
+    so verify() itself never touches the database.
+    """
+
+    def __init__(self, secret, algorithm, ttl=300, max_entries=10000, refresh=30):
+        self.secret = secret
+        self.algorithm = algorithm
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.refresh = refresh
+
+        self.cache = OrderedDict()
+        self.revoked = {}
+        self.revoked_loaded = 0.0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.stopping = threading.Event()
+        self.thread = None
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        self.purge()
+        self.load_revoked()
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="token-revocations", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def _run(self):
+        while not self.stopping.wait(self.refresh):
+            try:
+                # pick up revocations made by other workers
+                self.purge()
+                self.load_revoked()
+            except Exception as e:
+                print("Revocation refresh failed:", e)
+
+    # ---------- verification ----------
+
+    def verify(self, token):
+        key = token_hash(token)
+        now = time.time()
+
+        if self.is_revoked(key, now):
+            raise InvalidToken("revoked")
+
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry and entry[1] > now:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry:
+                del self.cache[key]
+            self.misses += 1
+
+        try:
+            claims = jwt.decode(token, self.secret, algorithms=[self.algorithm])
+        except jwt.PyJWTError as e:
+            raise InvalidToken(str(e))
+
+        expires = min(now + self.ttl, claims.get("exp", now + self.ttl))
+        with self.lock:
+            self.cache[key] = (claims, expires)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+
+        return claims
+
+    # ---------- revocation ----------
+
+    def revoke(self, token):
+        """Invalidate a token now, e.g. on logout."""
+        try:
+            claims = jwt.decode(token, self.secret, algorithms=[self.algorithm])
+        except jwt.PyJWTError:
+            return      # already unusable
+
+        key = token_hash(token)
+        expires = int(claims.get("exp", time.time() + self.ttl))
+
+        storage.execute(
+            "INSERT OR REPLACE INTO revoked_tokens(token_hash, expires_at) VALUES (?,?)",
+            (key, expires)
+        )
+        with self.lock:
+            self.revoked[key] = expires
+            self.cache.pop(key, None)
+
+    def purge(self):
+        storage.execute("DELETE FROM revoked_tokens WHERE expires_at < ?", (int(time.time()),))
+
+    def load_revoked(self):
+        rows = storage.query_all("SELECT token_hash, expires_at FROM revoked_tokens")
+
+        with self.lock:
+            self.revoked = dict(rows)
+            self.revoked_loaded = time.time()
+            for key in self.revoked:
+                self.cache.pop(key, None)
+
+    def is_revoked(self, key, now):
+        with self.lock:
+            expires = self.revoked.get(key)
+            if expires is None:
+                return False
+            if expires < now:
+                del self.revoked[key]
+                return False
+            return True
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.cache),
+                "revoked": len(self.revoked),
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -0,0 +1,159 @@
+import json
+import multiprocessing
+import os
+import time
+
+import storage
+
+AUDIO_EXTENSIONS = (".webm", ".wav", ".ogg", ".opus", ".mp3", ".m4a")
+
+_pipeline = None
+_batch_size = 8
+
+
+def iter_archive(dirs):
+    """Yield audio files from the archive directories one at a time."""
+    for d in dirs:
+        if not os.path.isdir(d):
+            continue
+        with os.scandir(d) as it:
+            for entry in sorted(it, key=lambda e: e.name):
+                if entry.is_file() and entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                    yield entry.path
+
+
+def load_checkpoint(path):
+    done = set()
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    done.add(json.loads(line)["path"])
+    return done
+
+
+def _init_worker(model, device, compute_type, threads, batch_size):
+    global _pipeline, _batch_size
+    from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+    whisper = WhisperModel(
+        model, device=device, compute_type=compute_type, cpu_threads=threads
+    )
+    _pipeline = BatchedInferencePipeline(model=whisper)
+    _batch_size = batch_size
+
+
+def _transcribe(path):
+    from segments import from_whisper, pack
+
+    try:
+        segments, info = _pipeline.transcribe(path, batch_size=_batch_size)
+        segments = list(segments)
+        text = "".join(s.text for s in segments).strip() or "No speech detected."
+        # the timing index is rebuilt with the text so the two never disagree
+        blob = pack(*from_whisper(segments))
+        return path, text, blob, info.duration, None
+    except Exception as e:
+        return path, None, None, 0.0, str(e)
+
+
+def _flush(rows, checkpoint, resummarize):
+    if resummarize:
+        sql = ("UPDATE sessions SET transcript=?, segments=?, summary='', status='pending', "
+               "summary_attempts=0, summary_next_at=0 WHERE id=?")
+    else:
+        sql = "UPDATE sessions SET transcript=?, segments=? WHERE id=?"
+
+    with storage.transaction() as conn:
+        updated = conn.executemany(
+            sql, [(r["text"], r["segments"], r["sid"]) for r in rows]
+        ).rowcount
+
+    # only checkpoint what has been committed
+    for r in rows:
+        checkpoint.write(json.dumps({"path": r["path"], "sid": r["sid"]}) + "\n")
+    checkpoint.flush()
+    os.fsync(checkpoint.fileno())
+
+    return updated
+
+
+def retranscribe(
+    dirs,
+    model="small",
+    device="cpu",
+    compute_type="int8",
+    workers=None,
+    threads_per_worker=2,
+    batch_size=8,
+    commit_every=50,
+    checkpoint_path=None,
+    resummarize=False,
+    limit=None
+):
+    """
+    Re-run Whisper over the audio archive and write transcripts back to
+    sessions. Files are decoded with faster_whisper's batched pipeline in
+    a pool of processes, results are committed in bulk, and every committed
+    file is appended to a checkpoint so an interrupted run resumes where it
+    stopped. Session ids are taken from the file name.
+    """
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    checkpoint_path = checkpoint_path or os.path.join(
+        storage.BASE_DIR, "data", f"retranscribe-{model}-{compute_type}.checkpoint"
+    )
+    os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+
+    done = load_checkpoint(checkpoint_path)
+    todo = (p for p in iter_archive(dirs) if p not in done)
+    if limit:
+        todo = (p for i, p in zip(range(limit), todo))
+
+    print(f"Re-transcribing with {model}/{compute_type} on {workers} workers "
+          f"({len(done)} files already done)")
+
+    stats = {"files": 0, "updated": 0, "failed": 0, "audio_seconds": 0.0}
+    pending = []
+    start = time.time()
+
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(
+        workers,
+        initializer=_init_worker,
+        initargs=(model, device, compute_type, threads_per_worker, batch_size)
+    ) as pool, open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+
+        for path, text, blob, duration, error in pool.imap_unordered(_transcribe, todo):
+            stats["files"] += 1
+            stats["audio_seconds"] += duration
+
+            if error:
+                stats["failed"] += 1
+                print("Failed:", path, error)
+                continue
+
+            sid = os.path.splitext(os.path.basename(path))[0]
+            pending.append({"path": path, "sid": sid, "text": text, "segments": blob})
+
+            if len(pending) >= commit_every:
+                stats["updated"] += _flush(pending, checkpoint, resummarize)
+                pending = []
+                _report(stats, start)
+
+        if pending:
+            stats["updated"] += _flush(pending, checkpoint, resummarize)
+
+    _report(stats, start)
+    return stats
+
+
+def _report(stats, start):
+    wall = max(time.time() - start, 1e-6)
+    stats["wall_seconds"] = round(wall, 2)
+    stats["realtime_factor"] = round(stats["audio_seconds"] / wall, 2)
+    print(
+        f"{stats['files']} files, {stats['updated']} sessions updated, "
+        f"{stats['failed']} failed, {stats['audio_seconds']:.0f}s audio in "
+        f"{wall:.0f}s -> {stats['realtime_factor']} audio-s/wall-s"
+    )
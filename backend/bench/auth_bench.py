@@ -0,0 +1,71 @@
+"""
+Auth overhead per request: plain jwt.decode against TokenVerifier with a
+cold and a warm claims cache.
+
+    python bench/auth_bench.py --iterations 50000 --tokens 100
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from common import percentile, temp_db
+
+
+def measure(fn, tokens, iterations):
+    samples = []
+    for i in range(iterations):
+        token = tokens[i % len(tokens)]
+        start = time.perf_counter()
+        fn(token)
+        samples.append(time.perf_counter() - start)
+    return {
+        "mean_us": round(sum(samples) / len(samples) * 1e6, 2),
+        "p50_us": round(percentile(samples, 50) * 1e6, 2),
+        "p99_us": round(percentile(samples, 99) * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50000)
+    parser.add_argument("--tokens", type=int, default=100)
+    args = parser.parse_args()
+
+    temp_db()
+    import jwt
+    import storage
+    from auth import TokenVerifier
+
+    storage.init_db()
+    secret, algorithm = "bench-secret", "HS256"
+    exp = datetime.utcnow() + timedelta(hours=1)
+    tokens = [
+        jwt.encode({"sub": f"user{i}@example.com", "role": "doctor", "exp": exp},
+                   secret, algorithm=algorithm)
+        for i in range(args.tokens)
+    ]
+
+    def decode(token):
+        return jwt.decode(token, secret, algorithms=[algorithm])
+
+    # a cache too small to ever hit shows the cost of a miss
+    cold = TokenVerifier(secret, algorithm, max_entries=0)
+    cold.load_revoked()
+    warm = TokenVerifier(secret, algorithm)
+    warm.load_revoked()
+    for token in tokens:
+        warm.verify(token)
+
+    print(json.dumps({
+        "iterations": args.iterations,
+        "distinct_tokens": args.tokens,
+        "jwt_decode": measure(decode, tokens, args.iterations),
+        "verifier_miss": measure(cold.verify, tokens, args.iterations),
+        "verifier_hit": measure(warm.verify, tokens, args.iterations),
+        "cache": warm.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
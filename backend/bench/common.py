@@ -0,0 +1,134 @@
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def temp_db():
+    """Point storage at a throwaway database; call before importing app."""
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-"), "records.db")
+    os.environ["RECORDS_DB"] = path
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    return path
+
+
+def scratch_dirs():
+    """
+    Point every directory the app writes to at a scratch dir, with
+    retention off; call before importing app so a bench never touches
+    the real audio, audit journal, upload spool or archive.
+    """
+    scratch = tempfile.mkdtemp(prefix="bench-data-")
+    os.environ["AUDIO_DIR"] = os.path.join(scratch, "audio")
+    os.environ["AUDIT_JOURNAL_DIR"] = os.path.join(scratch, "audit")
+    os.environ["UPLOAD_TMP_DIR"] = os.path.join(scratch, "uploads")
+    os.environ["RETENTION_DIR"] = os.path.join(scratch, "retention")
+    os.environ["RETENTION_POLICIES"] = ""
+    os.environ["ORPHAN_SWEEP"] = "0"
+    return scratch
+
+
+def use_fake_whisper(api, latency=0.0, rtf=0.05):
+    """Swap the app's Whisper models for fake_whisper so nothing is downloaded."""
+    import fake_whisper
+
+    api.models.device, api.models.compute_type = "cpu", "int8"
+    api.models.factory = fake_whisper.factory(latency, rtf)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(app, port):
+    """Run uvicorn in a daemon thread and wait until it accepts requests."""
+    import uvicorn
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    t = threading.Thread(target=server.run, daemon=True)
+    t.start()
+
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("server did not start")
+        time.sleep(0.05)
+    return server, t
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+def summarize(latencies, elapsed):
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+class Client:
+    """One keep-alive connection per thread; returns (status, headers, body, seconds)."""
+
+    def __init__(self, port):
+        self.port = port
+        self.local = threading.local()
+
+    def _conn(self):
+        import http.client
+
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+            self.local.conn = conn
+        return conn
+
+    def request(self, method, path, body=None, headers=None):
+        start = time.perf_counter()
+        try:
+            conn = self._conn()
+            conn.request(method, path, body, headers or {})
+            resp = conn.getresponse()
+            data = resp.read()
+            status, resp_headers = resp.status, dict(resp.getheaders())
+        except OSError:
+            # dropped connection: count it as a failure and reconnect next time
+            self.local.conn = None
+            status, resp_headers, data = 599, {}, b""
+        return status, resp_headers, data, time.perf_counter() - start
+
+
+def multipart(fields, files):
+    """Encode form fields and (name, filename, bytes, content_type) files."""
+    boundary = "bench" + os.urandom(8).hex()
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n".encode("utf-8")
+        )
+    for name, filename, data, content_type in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+            f'filename="{filename}"\r\nContent-Type: {content_type}\r\n\r\n'.encode("utf-8")
+            + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
@@ -0,0 +1,220 @@
+"""
+Load test for the dictation API with stub Whisper and Ollama backends.
+
+Drives the real FastAPI app through /register, /login, /transcribe,
+/summary/{sid}, /history, /session/{sid} and /audio at a fixed concurrency,
+using the sample recordings in backend/audio. Whisper is replaced by
+fake_whisper (no weights) and Ollama by fake_ollama, each with
+configurable latency, so it runs offline on a CPU box. Results go to a JSON
+file for comparing commits.
+
+    python bench/load_bench.py --users 20 --requests 100 --concurrency 10 \
+        --whisper-rtf 0.05 --ollama-latency 0.5 --out bench_results.json
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from common import (
+    BACKEND_DIR, Client, free_port, multipart, scratch_dirs, serve, summarize,
+    temp_db, use_fake_whisper
+)
+
+PASSWORD = "Bench-pass1!"
+
+
+def run_phase(name, tasks, concurrency, results):
+    """Run tasks (callables returning (status, seconds, value)) and record them."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        outcomes = list(pool.map(lambda task: task(), tasks))
+    elapsed = time.perf_counter() - start
+
+    statuses = {}
+    for status, _, _ in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    ok = [seconds for status, seconds, _ in outcomes if status < 400]
+    results[name] = {
+        **summarize(ok, elapsed),
+        "statuses": statuses,
+        "errors": len(outcomes) - len(ok)
+    }
+    print(f"{name:<12} {results[name]['rps']:>8} req/s  "
+          f"p50 {results[name]['p50_ms']} ms  p99 {results[name]['p99_ms']} ms  "
+          f"errors {results[name]['errors']}")
+    return [value for status, _, value in outcomes if status < 400]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=50, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--whisper-latency", type=float, default=0.0)
+    parser.add_argument("--whisper-rtf", type=float, default=0.05)
+    parser.add_argument("--whisper-workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--ollama-latency", type=float, default=0.2)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--cache", action="store_true", help="keep the transcript cache on")
+    parser.add_argument("--audio", default=os.path.join(BACKEND_DIR, "audio"))
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args()
+
+    samples = sorted(glob.glob(os.path.join(args.audio, "*.webm")))
+    if not samples:
+        raise SystemExit(f"No .webm samples in {args.audio}")
+    recordings = [(os.path.basename(p), open(p, "rb").read()) for p in samples]
+
+    # everything the app writes goes to a scratch directory
+    temp_db()
+    scratch_dirs()
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    os.environ["HASH_MAX_PENDING"] = str(max(args.concurrency * 2, 64))
+    os.environ["WHISPER_WORKERS"] = str(args.whisper_workers)
+    os.environ["WHISPER_QUEUE_SIZE"] = str(args.queue_size)
+    os.environ["AUDIO_STREAMS_PER_USER"] = str(args.concurrency)
+    if not args.cache:
+        os.environ["CACHE_MAX_MB"] = "0"
+
+    from fake_ollama import FakeOllamaServer
+    from fake_smtp import FakeSMTPServer
+    ollama = FakeOllamaServer(latency=args.ollama_latency).start()
+    smtp = FakeSMTPServer().start()
+    os.environ["OLLAMA_URL"] = ollama.url
+    os.environ["SMTP_HOST"] = "127.0.0.1"
+    os.environ["SMTP_PORT"] = str(smtp.port)
+    os.environ["SMTP_STARTTLS"] = "0"
+
+    import app as api
+    import storage
+
+    use_fake_whisper(api, args.whisper_latency, args.whisper_rtf)
+
+    port = free_port()
+    server, thread = serve(api.app, port)
+    client = Client(port)
+    results = {}
+    n = args.requests
+
+    # ---------- auth ----------
+
+    emails = [f"bench{i}@example.com" for i in range(args.users)]
+
+    def register(email):
+        def task():
+            body = urlencode({"email": email, "password": PASSWORD})
+            status, _, _, t = client.request(
+                "POST", "/register", body,
+                {"Content-Type": "application/x-www-form-urlencoded"}
+            )
+            return status, t, email
+        return task
+
+    run_phase("register", [register(e) for e in emails], args.concurrency, results)
+    storage.execute("UPDATE users SET verified=1")
+
+    def login(email):
+        def task():
+            body = urlencode({"username": email, "password": PASSWORD})
+            status, _, data, t = client.request(
+                "POST", "/login", body,
+                {"Content-Type": "application/x-www-form-urlencoded"}
+            )
+            token = json.loads(data)["access_token"] if status == 200 else None
+            return status, t, token
+        return task
+
+    tokens = run_phase(
+        "login", [login(emails[i % len(emails)]) for i in range(n)], args.concurrency, results
+    )
+    if not tokens:
+        raise SystemExit("No successful logins; is the server healthy?")
+
+    def auth(i):
+        return {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+
+    # ---------- transcription ----------
+
+    def transcribe(i):
+        def task():
+            name, data = recordings[i % len(recordings)]
+            body, content_type = multipart(
+                {"patient_id": f"P{i % 25:03d}"}, [("audio", name, data, "audio/webm")]
+            )
+            status, _, resp, t = client.request(
+                "POST", "/transcribe", body, {**auth(i), "Content-Type": content_type}
+            )
+            return status, t, (json.loads(resp)["id"], i) if status == 200 else None
+        return task
+
+    sessions = run_phase("transcribe", [transcribe(i) for i in range(n)], args.concurrency, results)
+
+    def summary(sid, i):
+        def task():
+            status, _, data, t = client.request("GET", f"/summary/{sid}?wait=30", headers=auth(i))
+            return status, t, json.loads(data).get("status") if status == 200 else None
+        return task
+
+    run_phase("summary", [summary(sid, i) for sid, i in sessions], args.concurrency, results)
+
+    # ---------- reads ----------
+
+    def history(i):
+        def task():
+            path = "/history" if i % 2 else f"/history/P{i % 25:03d}"
+            status, _, _, t = client.request("GET", path, headers=auth(i))
+            return status, t, None
+        return task
+
+    run_phase("history", [history(i) for i in range(n)], args.concurrency, results)
+
+    def session(sid, i):
+        def task():
+            status, _, data, t = client.request("GET", f"/session/{sid}", headers=auth(i))
+            audio = json.loads(data).get("audio") if status == 200 else None
+            return status, t, (audio, i)
+        return task
+
+    files = run_phase("session", [session(sid, i) for sid, i in sessions], args.concurrency, results)
+
+    def audio(path, i):
+        def task():
+            name = os.path.basename(path or "")
+            status, _, _, t = client.request("GET", f"/audio/{name}", headers=auth(i))
+            return status, t, None
+        return task
+
+    run_phase("audio", [audio(path, i) for path, i in files if path], args.concurrency, results)
+
+    server.should_exit = True
+    thread.join(timeout=10)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": int(time.time()),
+        "config": vars(args),
+        "endpoints": results
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("Results written to", args.out)
+
+
+if __name__ == "__main__":
+    main()
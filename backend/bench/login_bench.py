@@ -0,0 +1,113 @@
+"""
+Login throughput benchmark.
+
+Starts the API against a temporary database and a local SMTP sink, creates
+a verified user and fires concurrent POST /login requests. A health check
+runs alongside to show whether bcrypt is still stalling other requests.
+
+    python bench/login_bench.py --requests 200 --concurrency 20 --rounds 12
+"""
+import argparse
+import http.client
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from common import free_port, scratch_dirs, serve, summarize, temp_db, use_fake_whisper
+
+EMAIL = "bench@example.com"
+PASSWORD = "Bench-pass1!"
+
+
+def login(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    body = urlencode({"username": EMAIL, "password": PASSWORD})
+    start = time.perf_counter()
+    conn.request(
+        "POST", "/login", body,
+        {"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    resp = conn.getresponse()
+    resp.read()
+    conn.close()
+    return resp.status, time.perf_counter() - start
+
+
+def probe(port, stop, latencies):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    while not stop.is_set():
+        start = time.perf_counter()
+        conn.request("GET", "/healthz")
+        conn.getresponse().read()
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.01)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--hash-workers", type=int, default=2)
+    args = parser.parse_args()
+
+    temp_db()
+    scratch_dirs()
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    os.environ["HASH_WORKERS"] = str(args.hash_workers)
+    os.environ["HASH_MAX_PENDING"] = str(max(args.concurrency, 64))
+
+    from fake_smtp import FakeSMTPServer
+    smtp = FakeSMTPServer().start()
+    os.environ["SMTP_HOST"] = "127.0.0.1"
+    os.environ["SMTP_PORT"] = str(smtp.port)
+    os.environ["SMTP_STARTTLS"] = "0"
+
+    import app as api
+    import storage
+
+    use_fake_whisper(api)
+    port = free_port()
+    server, thread = serve(api.app, port)
+
+    hashed = api.hasher.context.hash(PASSWORD)
+    storage.execute(
+        "INSERT INTO users(email,password,role,verified) VALUES (?,?,?,?)",
+        (EMAIL, hashed, "doctor", 1)
+    )
+
+    stop = threading.Event()
+    health = []
+    prober = threading.Thread(target=probe, args=(port, stop, health), daemon=True)
+    prober.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(lambda _: login(port), range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    prober.join()
+    server.should_exit = True
+    thread.join(timeout=10)
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    print(json.dumps({
+        "bcrypt_rounds": args.rounds,
+        "hash_workers": args.hash_workers,
+        "concurrency": args.concurrency,
+        "statuses": statuses,
+        "login": summarize([t for _, t in results], elapsed),
+        "healthz_during_load": summarize(health, elapsed),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
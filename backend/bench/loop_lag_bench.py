@@ -0,0 +1,150 @@
+"""
+Event-loop lag while the database is busy: route-style reads and writes
+issued straight from coroutines (the old way) against the same workload
+through db.Database and the repositories.
+
+A ticker sleeps 1 ms in a loop and records how late it wakes; that
+overshoot is the time the loop spent blocked. On the loop, lag grows
+with query time; through the executor it stays around the interpreter's
+thread switch interval (5 ms by default), since the DB threads share the GIL.
+
+    python bench/loop_lag_bench.py --rows 50000 --tasks 32 --seconds 5
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from common import percentile, temp_db
+
+TICK = 0.001
+
+
+async def ticker(stop, lags):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+def lag_report(lags, ops, seconds):
+    return {
+        "ops": ops,
+        "ops_per_sec": round(ops / seconds, 1),
+        "ticks": len(lags),
+        "lag_p50_ms": round(percentile(lags, 50) * 1000, 2),
+        "lag_p99_ms": round(percentile(lags, 99) * 1000, 2),
+        "lag_max_ms": round(max(lags, default=0) * 1000, 2),
+    }
+
+
+def seed(storage, rows, patients):
+    now = int(time.time())
+    storage.executemany(
+        "INSERT INTO sessions (id, patient_id, transcript, summary, timestamp, status) "
+        "VALUES (?,?,?,?,?,?)",
+        [
+            (str(uuid.uuid4()), f"P{i % patients:04d}",
+             "patient reports chest pain and shortness of breath " * 8,
+             "summary " * 20, now - i, "done")
+            for i in range(rows)
+        ]
+    )
+
+
+async def run(seconds, tasks, patients, direct):
+    import storage
+    from db import Database
+    from repositories import SessionRepository
+
+    db = Database(readers=4)
+    db.start()
+    sessions = SessionRepository(db)
+
+    def insert(sid, pid):
+        storage.execute(
+            "INSERT INTO sessions (id, patient_id, transcript, timestamp, status) "
+            "VALUES (?,?,?,?,?)",
+            (sid, pid, "new dictation " * 50, int(time.time()), "done")
+        )
+
+    def history_sync(pid):
+        return storage.query_all(
+            "SELECT id, patient_id, audio_file, timestamp, status FROM sessions "
+            "WHERE patient_id = ? ORDER BY timestamp DESC, id DESC LIMIT 50",
+            (pid,)
+        )
+
+    stop = asyncio.Event()
+    lags = []
+    ops = 0
+
+    async def worker(n):
+        nonlocal ops
+        rng = random.Random(n)
+        while not stop.is_set():
+            pid = f"P{rng.randrange(patients):04d}"
+            write = rng.random() < 0.2
+            if direct:
+                # what the sync-over-async routes amounted to: blocking calls on the loop
+                if write:
+                    insert(str(uuid.uuid4()), pid)
+                else:
+                    history_sync(pid)
+                await asyncio.sleep(0)
+            elif write:
+                await db.write(insert, str(uuid.uuid4()), pid)
+            else:
+                await sessions.page(pid, match="exact")
+            ops += 1
+
+    tick = asyncio.create_task(ticker(stop, lags))
+    workers = [asyncio.create_task(worker(n)) for n in range(tasks)]
+    start = time.perf_counter()
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(tick, *workers)
+    elapsed = time.perf_counter() - start
+
+    db.stop()
+    return lag_report(lags, ops, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--patients", type=int, default=500)
+    parser.add_argument("--tasks", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    temp_db()
+    import storage
+
+    storage.init_db()
+    seed(storage, args.rows, args.patients)
+
+    idle = []
+
+    async def baseline():
+        stop = asyncio.Event()
+        task = asyncio.create_task(ticker(stop, idle))
+        await asyncio.sleep(1)
+        stop.set()
+        await task
+
+    asyncio.run(baseline())
+
+    print(json.dumps({
+        "rows": args.rows,
+        "tasks": args.tasks,
+        "idle": lag_report(idle, 0, 1),
+        "on_loop": asyncio.run(run(args.seconds, args.tasks, args.patients, direct=True)),
+        "executor": asyncio.run(run(args.seconds, args.tasks, args.patients, direct=False)),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:         # optional: without it only gzip is offered
+    brotli = None
+
+from delivery import encoded_etag
+
+# JSON and text compress well; audio is already compressed and served
+# with ranges, so it always passes through untouched
+COMPRESSIBLE_TYPES = ("application/json", "text/plain", "text/html", "text/csv")
+
+
+def choose_encoding(accept):
+    """Best encoding the client accepts: br, then gzip, else None."""
+    offered = {}
+    for part in (accept or "").split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name.strip():
+            offered[name.strip().lower()] = q
+
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if offered.get(encoding, offered.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+class Compressor:
+
+    def __init__(self, encoding, gzip_level, brotli_quality):
+        if encoding == "br":
+            c = brotli.Compressor(quality=brotli_quality)
+            self.compress, self.finish = c.process, c.finish
+        else:
+            c = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)     # 31: gzip framing
+            self.compress, self.finish = c.compress, c.flush
+
+
+def get_header(headers, name):
+    for k, v in headers:
+        if k.lower() == name:
+            return v.decode("latin-1")
+    return None
+
+
+def set_header(headers, name, value):
+    headers[:] = [(k, v) for k, v in headers if k.lower() != name]
+    if value is not None:
+        headers.append((name, value.encode("latin-1")))
+
+
+class CompressionMiddleware:
+    """
+    Compresses JSON/text responses of at least `minimum_size` bytes with
+    brotli (if installed) or gzip, per the request's Accept-Encoding.
+
+    Single-message bodies (every JSONResponse) are compressed whole and
+    get an exact Content-Length; streamed bodies are compressed chunk by
+    chunk. Strong ETags get an encoding suffix so each representation
+    has its own tag; delivery.etag_matches strips it again. A 304 has no
+    body to compress but repeats the tag of the representation the
+    client holds, so it gets the same suffix.
+    """
+
+    def __init__(self, app, minimum_size=1024, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def revalidated_etag(self, etag, encoding, if_none_match):
+        """
+        ETag for a 304: suffixed when the client revalidated the encoded
+        representation, bare otherwise (bodies under minimum_size and
+        audio went out uncompressed, with the bare tag).
+        """
+        tags = {t.strip().removeprefix("W/") for t in (if_none_match or "").split(",")}
+        encoded = encoded_etag(etag, encoding)
+        return encoded if encoded in tags else etag
+
+    def compressible(self, status, headers):
+        if status < 200 or status in (204, 206, 304):
+            return False
+        if get_header(headers, b"content-encoding") or get_header(headers, b"content-range"):
+            return False
+        content_type = (get_header(headers, b"content-type") or "").split(";")[0].strip()
+        return content_type in COMPRESSIBLE_TYPES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        accept = get_header(scope.get("headers", []), b"accept-encoding")
+        encoding = choose_encoding(accept)
+        if not encoding:
+            return await self.app(scope, receive, send)
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                etag = get_header(headers, b"etag")
+                if message["status"] == 304 and etag:
+                    inm = get_header(scope.get("headers", []), b"if-none-match")
+                    set_header(headers, b"etag", self.revalidated_etag(etag, encoding, inm))
+                    passthrough = True
+                    await send({**message, "headers": headers})
+                    return
+                if not self.compressible(message["status"], headers):
+                    passthrough = True
+                    await send(message)
+                    return
+                # the body differs by Accept-Encoding whether or not this one is compressed
+                vary = get_header(headers, b"vary")
+                if not vary:
+                    set_header(headers, b"vary", "Accept-Encoding")
+                elif "accept-encoding" not in vary.lower():
+                    set_header(headers, b"vary", vary + ", Accept-Encoding")
+                start = {**message, "headers": headers}
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+
+            if compressor is None:
+                if not more and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                compressor = Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers = start["headers"]
+                set_header(headers, b"content-encoding", encoding)
+                etag = get_header(headers, b"etag")
+                if etag:
+                    set_header(headers, b"etag", encoded_etag(etag, encoding))
+
+                if not more:
+                    data = compressor.compress(body) + compressor.finish()
+                    set_header(headers, b"content-length", str(len(data)))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": data})
+                    return
+
+                set_header(headers, b"content-length", None)
+                await send(start)
+
+            data = compressor.compress(body)
+            if not more:
+                data += compressor.finish()
+            if data or not more:
+                await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
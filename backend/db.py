@@ -0,0 +1,60 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import storage
+
+
+class Database:
+    """
+    Async front for storage: blocking sqlite3 calls run on dedicated
+    threads so coroutines never touch the database on the event loop.
+
+    Route writes go through one writer thread, in submission order, so
+    they never contend with each other for SQLite's write lock. Reads
+    spread over `readers` threads; in WAL mode they run alongside the
+    writer. Every thread keeps its own connection (storage.get_conn).
+
+    This is not the only writer in the process: background services on
+    their own threads (summary runner, audit writer, uploads, retention,
+    token revocations, the importer) write through storage directly and
+    are ordered against the writer by BEGIN IMMEDIATE and busy_timeout.
+    """
+
+    def __init__(self, readers=4):
+        self.readers = readers
+        self.reader_pool = None
+        self.writer_pool = None
+
+    def start(self):
+        self.reader_pool = ThreadPoolExecutor(self.readers, thread_name_prefix="db-reader")
+        self.writer_pool = ThreadPoolExecutor(1, thread_name_prefix="db-writer")
+
+    def stop(self):
+        # connections are thread-local and close when their thread exits
+        for pool in (self.reader_pool, self.writer_pool):
+            if pool:
+                pool.shutdown(wait=True)
+        self.reader_pool = self.writer_pool = None
+
+    async def read(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.reader_pool, fn, *args)
+
+    async def write(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.writer_pool, fn, *args)
+
+    # ---------- shortcuts ----------
+
+    async def query_one(self, sql, params=()):
+        return await self.read(storage.query_one, sql, params)
+
+    async def query_all(self, sql, params=()):
+        return await self.read(storage.query_all, sql, params)
+
+    async def execute(self, sql, params=()):
+        # the cursor stays on the writer thread; callers get the rowcount
+        return await self.write(lambda: storage.execute(sql, params).rowcount)
+
+    async def executemany(self, sql, rows):
+        return await self.write(lambda: storage.executemany(sql, rows).rowcount)
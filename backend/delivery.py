@@ -0,0 +1,228 @@
+import hashlib
+import os
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+
+import anyio
+from fastapi import HTTPException
+from starlette.responses import JSONResponse, Response
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StreamLimiter:
+    """Caps how many audio streams a single user can have open at once."""
+
+    def __init__(self, per_user):
+        self.per_user = per_user
+        self.active = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, owner):
+        with self.lock:
+            n = self.active.get(owner, 0)
+            if n >= self.per_user:
+                return False
+            self.active[owner] = n + 1
+            return True
+
+    def release(self, owner):
+        with self.lock:
+            n = self.active.get(owner, 0) - 1
+            if n > 0:
+                self.active[owner] = n
+            else:
+                self.active.pop(owner, None)
+
+
+def file_etag(st):
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    Parse a single `bytes=` range into an inclusive (start, end).
+    Returns None when the header should be ignored; raises 416 when it
+    can't be satisfied.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+
+    spec = header[6:].split(",")[0].strip()
+    if "-" not in spec:
+        return None
+
+    first, last = spec.split("-", 1)
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # suffix range: last N bytes
+            length = int(last)
+            if length == 0:
+                raise ValueError
+            start = max(size - length, 0)
+            end = size - 1
+    except ValueError:
+        return None
+
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+
+    return start, min(end, size - 1)
+
+
+def encoded_etag(etag, encoding):
+    # a compressed body is a different representation, so a strong tag
+    # gets the encoding appended: "abc" -> "abc-gzip"
+    if etag.startswith('"') and etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+def strip_encoding(etag):
+    for encoding in ("br", "gzip"):
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def etag_matches(request, etag):
+    """If-None-Match check (weak comparison, any encoding of the same tag)."""
+    inm = request.headers.get("if-none-match")
+    if inm is None:
+        return False
+    tags = {strip_encoding(t.strip().removeprefix("W/")) for t in inm.split(",")}
+    return "*" in tags or etag in tags
+
+
+def version_etag(*parts):
+    """Strong ETag from row ids and versions; changes whenever any part does."""
+    digest = hashlib.sha1("\x1f".join(map(str, parts)).encode()).hexdigest()
+    return f'"{digest[:24]}"'
+
+
+def cache_headers(etag, headers=None):
+    # no-cache: clients may store it but must revalidate with If-None-Match
+    return {**(headers or {}), "ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def json_response(request, body, etag, headers=None):
+    """`body` as JSON tagged with `etag`, or an empty 304 if the client has it."""
+    headers = cache_headers(etag, headers)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(body, headers=headers)
+
+
+def not_modified(request, etag, mtime):
+    if request.headers.get("if-none-match") is not None:
+        return etag_matches(request, etag)
+
+    ims = request.headers.get("if-modified-since")
+    if ims:
+        try:
+            return int(mtime) <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+class FileRangeResponse(Response):
+    """
+    Sends a byte range of a file in fixed-size chunks, each read off the
+    event loop, so a long recording is never held in memory whole.
+    """
+
+    def __init__(self, path, start, end, status_code, headers, media_type, on_close=None):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.end = end
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers
+            })
+
+            if scope.get("method") == "HEAD":
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            with open(self.path, "rb") as f:
+                await anyio.to_thread.run_sync(f.seek, self.start)
+                remaining = self.end - self.start + 1
+                while remaining > 0:
+                    chunk = await anyio.to_thread.run_sync(f.read, min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": True
+                    })
+
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            if self.on_close:
+                self.on_close()
+
+
+def serve_file(request, path, media_type=None, max_age=3600, on_close=None):
+    """Build a cache-aware, range-capable response for `path`."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        if on_close:
+            on_close()
+        raise HTTPException(404, "Audio not found")
+
+    etag = file_etag(st)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Cache-Control": f"private, max-age={max_age}"
+    }
+
+    if not_modified(request, etag, st.st_mtime):
+        if on_close:
+            on_close()
+        return Response(status_code=304, headers=headers)
+
+    size = st.st_size
+    byte_range = None
+
+    # If-Range: only honour Range when the client still has this version
+    if_range = request.headers.get("if-range")
+    if not if_range or if_range == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except HTTPException:
+            if on_close:
+                on_close()
+            raise
+
+    if byte_range:
+        start, end = byte_range
+        status = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    else:
+        start, end = 0, size - 1
+        status = 200
+
+    headers["Content-Length"] = str(max(end - start + 1, 0))
+
+    return FileRangeResponse(path, start, end, status, headers, media_type, on_close)
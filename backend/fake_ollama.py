@@ -0,0 +1,114 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "Subjective:\n- Patient reports symptoms as dictated.\n\n"
+    "Objective:\n- Not mentioned\n\n"
+    "Assessment:\n- Not mentioned\n\n"
+    "Plan:\n- Follow up as needed."
+)
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """
+    Stand-in for `ollama serve` that speaks enough of /api/generate for the
+    LLM client, benchmarks and local testing without a model installed.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), reply=DEFAULT_REPLY, latency=0.0, token_delay=0.0):
+        super().__init__(address, FakeOllamaHandler)
+        self.reply = reply
+        self.latency = latency
+        self.token_delay = token_delay
+        self.requests = 0
+        self.connections = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        t = threading.Thread(target=self.serve_forever, daemon=True)
+        t.start()
+        return self
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # keep-alive like the real server
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._json({"models": [{"name": "phi3:mini"}, {"name": "llama3"}]})
+        else:
+            self._json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        self.server.requests += 1
+
+        if self.path != "/api/generate":
+            self._json({"error": "not found"}, 404)
+            return
+
+        time.sleep(self.server.latency)
+        model = payload.get("model", "")
+        tokens = self.server.reply.split(" ")
+
+        if not payload.get("stream", True):
+            self._json({"model": model, "response": self.server.reply, "done": True})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        for i, tok in enumerate(tokens):
+            text = tok if i == 0 else " " + tok
+            self._chunk({"model": model, "response": text, "done": False})
+            if self.server.token_delay:
+                time.sleep(self.server.token_delay)
+
+        self._chunk({"model": model, "response": "", "done": True})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _json(self, obj, status=200):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Ollama server")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(
+        ("127.0.0.1", args.port), latency=args.latency, token_delay=args.token_delay
+    )
+    print("Fake Ollama listening on", server.url)
+    server.serve_forever()
@@ -0,0 +1,93 @@
+import argparse
+import socketserver
+import threading
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Minimal local SMTP sink standing in for Gmail in tests and benchmarks.
+    Accepts any AUTH, keeps every message in `messages` as
+    (sender, recipients, data) and counts connections so connection reuse
+    can be checked.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 0)):
+        super().__init__(address, FakeSMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        t = threading.Thread(target=self.serve_forever, daemon=True)
+        t.start()
+        return self
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+
+        sender, recipients = None, []
+        self.reply("220 localhost fake smtp ready")
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode("utf-8", errors="ignore").strip()
+            verb = cmd.split(" ", 1)[0].upper()
+
+            if verb == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250-AUTH PLAIN LOGIN")
+                self.reply("250 8BITMIME")
+            elif verb == "HELO":
+                self.reply("250 localhost")
+            elif verb == "AUTH":
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb == "MAIL":
+                sender, recipients = cmd[10:].strip("<> "), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(cmd[8:].strip("<> "))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    data.append(chunk)
+                with self.server.lock:
+                    self.server.messages.append((sender, recipients, b"".join(data)))
+                self.reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local SMTP sink")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+
+    server = FakeSMTPServer(("127.0.0.1", args.port))
+    print("Fake SMTP listening on port", server.port)
+    server.serve_forever()
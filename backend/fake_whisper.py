@@ -0,0 +1,53 @@
+import time
+from collections import namedtuple
+
+SAMPLE_RATE = 16000
+
+Segment = namedtuple("Segment", "start end text words")
+Word = namedtuple("Word", "start end word probability")
+Info = namedtuple("Info", "language duration")
+
+DEFAULT_TEXT = "Patient reports intermittent chest pain for two days."
+
+
+class FakeWhisperModel:
+    """
+    Stand-in for faster_whisper.WhisperModel for benchmarks and offline
+    runs: no weights, no GPU. transcribe() sleeps for `latency` plus
+    `rtf` times the audio length, then returns one segment per
+    `segment_seconds` of audio with canned text.
+    """
+
+    def __init__(self, latency=0.0, rtf=0.05, segment_seconds=5.0, text=DEFAULT_TEXT):
+        self.latency = latency
+        self.rtf = rtf
+        self.segment_seconds = segment_seconds
+        self.text = text
+
+    def transcribe(self, audio, word_timestamps=False, **kwargs):
+        duration = len(audio) / SAMPLE_RATE
+        time.sleep(self.latency + self.rtf * duration)
+
+        segments = []
+        start = 0.0
+        while start < duration:
+            end = min(start + self.segment_seconds, duration)
+            words = None
+            if word_timestamps:
+                tokens = self.text.split()
+                step = (end - start) / max(len(tokens), 1)
+                words = [
+                    Word(start + i * step, start + (i + 1) * step, " " + t, 1.0)
+                    for i, t in enumerate(tokens)
+                ]
+            segments.append(Segment(start, end, " " + self.text, words))
+            start = end
+
+        return iter(segments), Info("en", duration)
+
+
+def factory(latency=0.0, rtf=0.05):
+    """A ModelRegistry factory that hands out fake models."""
+    def make(name, device, compute_type, num_workers):
+        return FakeWhisperModel(latency=latency, rtf=rtf)
+    return make
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """
+    bcrypt on a dedicated, bounded thread pool.
+
+    bcrypt is deliberately slow and releases the GIL, so running it here
+    keeps it off the event loop and out of Starlette's shared threadpool.
+    At most `max_pending` operations may be queued or running; past that
+    callers get HasherBusy and the route answers 503 instead of letting a
+    login burst pile up unbounded.
+    """
+
+    def __init__(self, rounds=12, workers=2, max_pending=64):
+        self.context = CryptContext(
+            schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds
+        )
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.slots = threading.BoundedSemaphore(max_pending)
+
+    async def _submit(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            self.slots.release()
+
+    async def hash(self, password):
+        return await self._submit(self.context.hash, password)
+
+    async def verify(self, password, hashed):
+        return await self._submit(self.context.verify, password, hashed)
+
+    def needs_update(self, hashed):
+        """True when a stored hash uses a different cost than configured."""
+        return self.context.needs_update(hashed)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,242 @@
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from datetime import datetime
+
+import storage
+
+INSERT_SQL = (
+    "INSERT OR IGNORE INTO sessions "
+    "(id, patient_id, transcript, summary, audio_file, timestamp, status) "
+    "VALUES (?,?,?,?,?,?,?)"
+)
+
+AUDIO_EXTENSIONS = (".opus", ".webm", ".wav", ".ogg", ".mp3", ".m4a")
+
+# stable ids for legacy notes rows, so re-running an import doesn't duplicate them
+NOTES_NAMESPACE = uuid.UUID("5b0c3f0e-2f6a-4f43-9a53-6c1f0d7e2a10")
+
+
+# ---------- sources ----------
+
+def iter_json_array(path, chunk_size=1024 * 1024):
+    """
+    Yield the objects of a top-level JSON array one at a time, reading the
+    file in chunks instead of json.load-ing it whole. Memory stays at
+    roughly one chunk plus the largest single record.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    started = False
+    eof = False
+
+    with open(path, encoding="utf-8") as f:
+        while True:
+            # skip whitespace, the opening bracket and separators
+            while pos < len(buf) and buf[pos] in " \t\r\n,[":
+                if buf[pos] == "[":
+                    if started:
+                        break
+                    started = True
+                pos += 1
+
+            if pos < len(buf) and buf[pos] == "]":
+                return
+
+            if pos < len(buf):
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    pos = end
+                    yield obj
+                    continue
+
+            if eof:
+                return
+
+            # need more input: drop what's consumed, read the next chunk
+            buf = buf[pos:]
+            pos = 0
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buf += chunk
+
+
+def history_records(path):
+    for rec in iter_json_array(path):
+        if isinstance(rec, dict) and rec.get("id"):
+            yield rec
+
+
+def notes_records(path):
+    """Rows of server.py's notes table, shaped like history.json records."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cur = conn.execute(
+            "SELECT id, timestamp, transcript, summary, audio_path FROM notes ORDER BY id"
+        )
+        for note_id, ts, transcript, summary, audio_path in cur:
+            yield {
+                "id": str(uuid.uuid5(NOTES_NAMESPACE, f"{note_id}:{ts}")),
+                "timestamp": ts,
+                "transcript": transcript,
+                "summary": summary,
+                "audio_path": audio_path
+            }
+    finally:
+        conn.close()
+
+
+# ---------- mapping ----------
+
+def to_epoch(value):
+    if value is None or value == "":
+        return int(time.time())
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(float(value))
+    except ValueError:
+        return int(datetime.fromisoformat(value).timestamp())
+
+
+class AudioLinker:
+    """
+    Finds a record's recording in the legacy locations and puts it in
+    AUDIO_DIR, where /audio can serve it. Hard-links when possible so
+    nothing is copied on the same filesystem.
+    """
+
+    def __init__(self, audio_dir, search_dirs):
+        self.audio_dir = audio_dir
+        self.search_dirs = [d for d in search_dirs if os.path.isdir(d)]
+        self.index = {}
+        for d in self.search_dirs:
+            for name in os.listdir(d):
+                self.index.setdefault(name, os.path.join(d, name))
+        self.linked = 0
+        self.missing = 0
+
+    def _find(self, rec):
+        for key in ("audio_file", "audio_path", "audio"):
+            if rec.get(key):
+                name = os.path.basename(rec[key])
+                if name in self.index:
+                    return self.index[name]
+                if os.path.isfile(rec[key]):
+                    return rec[key]
+
+        for ext in AUDIO_EXTENSIONS:
+            name = f"{rec['id']}{ext}"
+            if name in self.index:
+                return self.index[name]
+        return None
+
+    def link(self, rec):
+        src = self._find(rec)
+        if not src:
+            self.missing += 1
+            return None
+
+        dest = os.path.join(self.audio_dir, os.path.basename(src))
+        if os.path.abspath(src) != os.path.abspath(dest) and not os.path.exists(dest):
+            try:
+                os.link(src, dest)
+            except OSError:
+                shutil.copy2(src, dest)
+
+        self.linked += 1
+        return os.path.basename(dest)
+
+
+def to_row(rec, linker, default_patient):
+    """Raises ValueError/TypeError on a bad timestamp, before any audio is linked."""
+    timestamp = to_epoch(rec.get("timestamp"))
+    summary = rec.get("summary") or ""
+    return (
+        str(rec["id"]),
+        rec.get("patient_id") or default_patient,
+        rec.get("transcript") or "",
+        summary,
+        linker.link(rec),
+        timestamp,
+        # rows without a summary go to the background summarizer
+        "done" if summary else "pending"
+    )
+
+
+# ---------- import ----------
+
+def import_records(records, audio_dir, search_dirs, default_patient="UNKNOWN",
+                   batch_size=20000, defer_fts=True, report_every=5.0):
+    """
+    Bulk-insert records into sessions: executemany in one transaction per
+    batch, INSERT OR IGNORE so ids already present (or repeated in the
+    source) are skipped. With defer_fts the per-row FTS trigger is dropped
+    for the import and the index rebuilt once at the end. A malformed
+    record (unparseable timestamp) is logged and counted as invalid; the
+    rest of the import carries on.
+
+    Returns {"read", "inserted", "skipped", "invalid", "audio_linked",
+    "audio_missing", "seconds", "rows_per_sec"}.
+    """
+    os.makedirs(audio_dir, exist_ok=True)
+    linker = AudioLinker(audio_dir, search_dirs)
+
+    if defer_fts:
+        storage.execute("DROP TRIGGER IF EXISTS sessions_fts_insert")
+
+    start = last_report = time.time()
+    read = inserted = invalid = 0
+    batch = []
+
+    def flush():
+        nonlocal inserted
+        with storage.transaction() as c:
+            # rowcount leaves out the FTS trigger's writes and ignored duplicates
+            inserted += c.executemany(INSERT_SQL, batch).rowcount
+        batch.clear()
+
+    try:
+        for rec in records:
+            read += 1
+            try:
+                batch.append(to_row(rec, linker, default_patient))
+            except (TypeError, ValueError) as e:
+                invalid += 1
+                print(f"  skipping record {rec['id']}: {e}")
+                continue
+
+            if len(batch) >= batch_size:
+                flush()
+                if time.time() - last_report >= report_every:
+                    last_report = time.time()
+                    rate = read / (last_report - start)
+                    print(f"  {read} read, {inserted} inserted, {rate:,.0f} rows/s")
+
+        if batch:
+            flush()
+    finally:
+        if defer_fts:
+            storage.init_db()           # puts the trigger back
+            storage.rebuild_fts()
+
+    elapsed = time.time() - start
+    return {
+        "read": read,
+        "inserted": inserted,
+        "skipped": read - inserted - invalid,
+        "invalid": invalid,
+        "audio_linked": linker.linked,
+        "audio_missing": linker.missing,
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": round(read / elapsed) if elapsed else read
+    }
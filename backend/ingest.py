@@ -0,0 +1,169 @@
+import glob
+import hashlib
+import io
+import os
+import shutil
+import uuid
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+PLAYBACK_BITRATE = int(os.getenv("PLAYBACK_BITRATE", "24000"))
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadTooLong(Exception):
+    pass
+
+
+class Upload:
+    """A spooled upload on disk: its path, size and sha256."""
+
+    def __init__(self, path, size, sha256):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    def discard(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def spool(upload, tmp_dir, max_bytes, chunk_size=CHUNK_SIZE):
+    """
+    Copy an UploadFile to tmp_dir in fixed-size chunks, hashing as it goes,
+    so the recording is never held in memory whole. Raises UploadTooLarge
+    as soon as max_bytes is crossed; the partial file is removed on any
+    failure.
+    """
+    os.makedirs(tmp_dir, exist_ok=True)
+    path = os.path.join(tmp_dir, f"{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(path, "wb") as f:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLarge(size)
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    return Upload(path, size, digest.hexdigest())
+
+
+def sweep(tmp_dir):
+    """Remove spool files left behind by a crashed process."""
+    removed = 0
+    for path in glob.glob(os.path.join(tmp_dir, "*.part")):
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def probe_duration(path):
+    """Container duration in seconds from the file header, or None if unknown."""
+    import av
+
+    try:
+        with av.open(path) as container:
+            if container.duration:
+                return container.duration / av.time_base
+            stream = next(iter(container.streams.audio), None)
+            if stream is not None and stream.duration and stream.time_base:
+                return float(stream.duration * stream.time_base)
+    except Exception:
+        pass
+    return None
+
+
+def check_duration(path, max_seconds):
+    """Reject over-long recordings from the header, before anything is decoded."""
+    if not max_seconds:
+        return
+    duration = probe_duration(path)
+    if duration is not None and duration > max_seconds:
+        raise UploadTooLong(duration)
+
+
+def decode(source):
+    """
+    Decode an uploaded container (webm/ogg/wav/...) to 16 kHz mono float32.
+    `source` is a path (read incrementally by PyAV) or the raw bytes.
+    """
+    from faster_whisper import decode_audio
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return decode_audio(source, sampling_rate=SAMPLE_RATE)
+
+
+def encode_opus(audio, path, bitrate=PLAYBACK_BITRATE):
+    """Write 16 kHz mono samples as Ogg/Opus, the compact copy served for playback."""
+    import av
+
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).reshape(1, -1)
+
+    with av.open(path, "w", format="ogg") as out:
+        stream = out.add_stream("libopus", rate=SAMPLE_RATE)
+        stream.bit_rate = bitrate
+        stream.layout = "mono"
+
+        frame = av.AudioFrame.from_ndarray(pcm, format="s16", layout="mono")
+        frame.sample_rate = SAMPLE_RATE
+
+        for packet in stream.encode(frame):
+            out.mux(packet)
+        for packet in stream.encode(None):
+            out.mux(packet)
+
+
+def store(source, audio_dir, sid, max_seconds=None):
+    """
+    Decode an upload once and keep what later stages need: the PCM for
+    Whisper (returned, never written to disk) and an Opus file for playback.
+    Falls back to keeping the original upload if encoding fails.
+
+    `source` is a spooled upload path or raw bytes. Recordings that decode
+    to more than max_seconds raise UploadTooLong (headers can lie or be
+    missing, so this is checked again after decoding).
+
+    Returns (audio, audio_file): audio_file is the file name under
+    audio_dir, which is what sessions.audio_file stores, so the value is
+    the same whatever the OS path separator is.
+    """
+    audio = decode(source)
+    if max_seconds and len(audio) > max_seconds * SAMPLE_RATE:
+        raise UploadTooLong(len(audio) / SAMPLE_RATE)
+
+    path = os.path.join(audio_dir, f"{sid}.opus")
+
+    try:
+        encode_opus(audio, path)
+    except Exception as e:
+        print("Opus encode failed, keeping original upload:", e)
+        if os.path.exists(path):
+            os.remove(path)
+        path = os.path.join(audio_dir, f"{sid}.webm")
+        if isinstance(source, (bytes, bytearray)):
+            with open(path, "wb") as f:
+                f.write(source)
+        else:
+            shutil.copyfile(source, path)
+
+    return audio, os.path.basename(path)
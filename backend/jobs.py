@@ -0,0 +1,129 @@
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, fn, job_id=None, meta=None):
+        self.id = job_id or str(uuid.uuid4())
+        self.fn = fn
+        self.meta = meta or {}
+        self.status = "queued"
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = Future()
+
+    def info(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "created": int(self.created),
+            "started": int(self.started) if self.started else None,
+            "finished": int(self.finished) if self.finished else None,
+        }
+
+
+class WorkerPool:
+    """
+    Bounded job queue drained by a fixed set of worker threads, each of
+    which calls `job.fn()` for the jobs it picks up.
+    """
+
+    def __init__(self, workers=1, max_queue=8, job_ttl=3600, on_start=None):
+        self.workers = workers
+        self.on_start = on_start
+        self.job_ttl = job_ttl
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(
+                target=self._run, name=f"whisper-worker-{i}", daemon=True
+            )
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        for _ in self.threads:
+            self.queue.put(None)
+        for t in self.threads:
+            t.join(timeout=5)
+        self.threads = []
+
+    def submit(self, fn, job_id=None, meta=None):
+        job = Job(fn, job_id, meta)
+
+        with self.lock:
+            self._prune()
+            try:
+                self.queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFull()
+            self.jobs[job.id] = job
+
+        return job
+
+    def completed(self, result, job_id=None, meta=None):
+        """Register a job that was answered without running (e.g. cache hit)."""
+        job = Job(None, job_id, meta)
+        job.status = "done"
+        job.started = job.finished = time.time()
+        job.future.set_result(result)
+
+        with self.lock:
+            self._prune()
+            self.jobs[job.id] = job
+
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl
+        stale = [
+            jid for jid, j in self.jobs.items()
+            if j.finished and j.finished < cutoff
+        ]
+        for jid in stale:
+            del self.jobs[jid]
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+
+            job.status = "running"
+            job.started = time.time()
+            if self.on_start:
+                self.on_start(job)
+
+            try:
+                result = job.fn()
+                job.status = "done"
+                job.future.set_result(result)
+            except Exception as e:
+                print("Job failed:", job.id, e)
+                job.status = "error"
+                job.error = str(e)
+                job.future.set_exception(e)
+            finally:
+                job.finished = time.time()
+                self.queue.task_done()
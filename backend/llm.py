@@ -0,0 +1,143 @@
+import http.client
+import json
+import queue
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMTimeout(LLMError):
+    pass
+
+
+class OllamaClient:
+    """
+    Client for a resident Ollama server (`ollama serve`).
+
+    Keeps a small pool of keep-alive HTTP connections so each summary skips
+    process start-up and TCP setup, streams tokens from /api/generate, and
+    caps concurrent generations with a semaphore so a burst of notes queues
+    here instead of thrashing the model.
+    """
+
+    def __init__(
+        self,
+        base_url="http://127.0.0.1:11434",
+        model="phi3:mini",
+        timeout=60,
+        max_concurrency=2,
+        keep_alive="30m"
+    ):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.model = model
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.pool = queue.LifoQueue()
+
+    # ---------- connections ----------
+
+    def _connect(self):
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _checkout(self):
+        try:
+            return self.pool.get_nowait(), True
+        except queue.Empty:
+            return self._connect(), False
+
+    def _checkin(self, conn):
+        self.pool.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def _post(self, path, payload):
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+
+        conn, reused = self._checkout()
+        try:
+            conn.request("POST", path, body=body, headers=headers)
+            return conn, conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused:
+                raise
+            # idle keep-alive connection was closed by the server, retry once
+            conn = self._connect()
+            conn.request("POST", path, body=body, headers=headers)
+            return conn, conn.getresponse()
+
+    # ---------- generation ----------
+
+    def stream(self, prompt, model=None, options=None):
+        """Yield response tokens as the model produces them."""
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive
+        }
+        if options:
+            payload["options"] = options
+
+        if not self.slots.acquire(timeout=self.timeout):
+            raise LLMTimeout("Timed out waiting for a free LLM slot")
+
+        conn = None
+        clean = False
+        try:
+            deadline = time.monotonic() + self.timeout
+            conn, resp = self._post("/api/generate", payload)
+
+            if resp.status != 200:
+                detail = resp.read().decode("utf-8", errors="ignore")
+                clean = True
+                raise LLMError(f"Ollama returned {resp.status}: {detail}")
+
+            while True:
+                if time.monotonic() > deadline:
+                    raise LLMTimeout(f"Generation exceeded {self.timeout}s")
+
+                line = resp.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise LLMError(chunk["error"])
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    resp.read()         # drain so the connection can be reused
+                    clean = True
+                    break
+
+        except socket.timeout:
+            raise LLMTimeout(f"No response from Ollama within {self.timeout}s")
+        except (OSError, http.client.HTTPException) as e:
+            raise LLMError(f"Ollama request failed: {e}")
+        finally:
+            if conn is not None:
+                if clean and not resp.will_close:
+                    self._checkin(conn)
+                else:
+                    conn.close()
+            self.slots.release()
+
+    def generate(self, prompt, model=None, options=None):
+        return "".join(self.stream(prompt, model, options)).strip()
@@ -0,0 +1,137 @@
+import queue
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+
+class Mailer:
+    """
+    Outbound mail queue drained by one background thread.
+
+    The thread keeps a single SMTP connection open between messages
+    (re-checked with NOOP after `idle_timeout`) instead of connecting,
+    starting TLS and logging in for every email. Failed sends are retried
+    with backoff, reconnecting first.
+    """
+
+    def __init__(
+        self,
+        host,
+        port,
+        user=None,
+        password=None,
+        sender=None,
+        starttls=True,
+        max_queue=1000,
+        retries=3,
+        retry_base=2.0,
+        idle_timeout=60,
+        timeout=30
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.sender = sender or user
+        self.starttls = starttls
+        self.retries = retries
+        self.retry_base = retry_base
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.conn = None
+        self.last_used = 0.0
+        self.thread = None
+        self.sent = 0
+        self.failed = 0
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="mailer", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=10):
+        if self.thread:
+            self.queue.put(None, timeout=timeout)
+            self.thread.join(timeout=timeout)
+            self.thread = None
+        self._disconnect()
+
+    # ---------- sending ----------
+
+    def send(self, to_email, subject, body):
+        """Queue a plain-text email; returns False if the queue is full."""
+        message = MIMEMultipart()
+        message["From"] = self.sender
+        message["To"] = to_email
+        message["Subject"] = subject
+        message.attach(MIMEText(body, "plain"))
+
+        try:
+            self.queue.put_nowait((to_email, message.as_string()))
+            return True
+        except queue.Full:
+            print("Mail queue full, dropping email to", to_email)
+            self.failed += 1
+            return False
+
+    def _connect(self):
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            conn.starttls()
+        if self.user:
+            conn.login(self.user, self.password)
+        return conn
+
+    def _disconnect(self):
+        if self.conn is not None:
+            try:
+                self.conn.quit()
+            except Exception:
+                pass
+            self.conn = None
+
+    def _connection(self):
+        if self.conn is not None and time.time() - self.last_used > self.idle_timeout:
+            try:
+                self.conn.noop()
+            except Exception:
+                self.conn = None
+
+        if self.conn is None:
+            self.conn = self._connect()
+        return self.conn
+
+    def _deliver(self, to_email, raw):
+        for attempt in range(1, self.retries + 1):
+            try:
+                self._connection().sendmail(self.sender, to_email, raw)
+                self.last_used = time.time()
+                self.sent += 1
+                print("Email sent to", to_email)
+                return True
+            except Exception as e:
+                print(f"Email to {to_email} failed (attempt {attempt}):", e)
+                self._disconnect()
+                if attempt < self.retries:
+                    time.sleep(self.retry_base * 2 ** (attempt - 1))
+
+        self.failed += 1
+        return False
+
+    def _run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                # nothing to send for a while, let the server keep its socket
+                self._disconnect()
+                continue
+
+            if item is None:
+                break
+            self._deliver(*item)
@@ -0,0 +1,143 @@
+import argparse
+import os
+import time
+
+import storage
+
+
+def backfill_fts(args):
+    storage.init_db()
+    start = time.time()
+    count = storage.rebuild_fts()
+    print(f"Indexed {count} sessions in {time.time() - start:.1f}s")
+
+
+def retranscribe(args):
+    from batch import retranscribe as run
+
+    storage.init_db()
+    dirs = args.dirs or [
+        os.path.join(storage.BASE_DIR, "audio"),
+        os.path.join(storage.BASE_DIR, "data", "audio")
+    ]
+    run(
+        dirs,
+        model=args.model,
+        device=args.device,
+        compute_type=args.compute_type,
+        workers=args.workers,
+        threads_per_worker=args.threads,
+        batch_size=args.batch_size,
+        commit_every=args.commit_every,
+        checkpoint_path=args.checkpoint,
+        resummarize=args.resummarize,
+        limit=args.limit
+    )
+
+
+def import_legacy(args):
+    import importer
+
+    storage.init_db()
+    audio_dir = os.path.join(storage.BASE_DIR, "audio")
+    search_dirs = [
+        audio_dir,
+        os.path.join(storage.BASE_DIR, "data", "audio"),
+        os.path.dirname(os.path.abspath(storage.BASE_DIR))
+    ] + (args.search or [])
+
+    sources = []
+    if args.history and os.path.exists(args.history):
+        sources.append(("history.json", importer.history_records(args.history)))
+    if args.notes and os.path.exists(args.notes):
+        sources.append(("notes.db", importer.notes_records(args.notes)))
+    if not sources:
+        print("Nothing to import")
+        return
+
+    for name, records in sources:
+        print("Importing", name)
+        stats = importer.import_records(
+            records,
+            audio_dir,
+            search_dirs,
+            default_patient=args.patient_id,
+            batch_size=args.batch_size,
+            defer_fts=not args.keep_fts_triggers
+        )
+        print(
+            f"{name}: {stats['inserted']} inserted, {stats['skipped']} already present, "
+            f"{stats['invalid']} invalid, "
+            f"{stats['audio_linked']} audio relinked ({stats['audio_missing']} missing) "
+            f"in {stats['seconds']}s, {stats['rows_per_sec']:,} rows/s"
+        )
+
+
+def retention(args):
+    from retention import RetentionManager, parse_policies
+
+    storage.init_db()
+    root = os.getenv("RETENTION_DIR", os.path.join(storage.BASE_DIR, "data"))
+    manager = RetentionManager(
+        os.getenv("AUDIO_DIR", os.path.join(storage.BASE_DIR, "audio")),
+        os.getenv("AUDIO_ARCHIVE_DIR", os.path.join(root, "archive")),
+        os.path.join(root, "restored"),
+        parse_policies(args.policies or os.getenv("RETENTION_POLICIES", "")),
+        orphan_grace=args.orphan_grace_hours * 3600 if args.sweep_orphans else None,
+        io_bytes_per_sec=int(args.io_mbps * 1024 * 1024),
+        vacuum_interval=0 if args.vacuum else float("inf")
+    )
+    os.makedirs(manager.archive_dir, exist_ok=True)
+    os.makedirs(manager.restore_dir, exist_ok=True)
+    manager.run_once(dry_run=args.dry_run)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clinical app maintenance commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("backfill-fts", help="rebuild the transcript/summary search index")
+    p.set_defaults(func=backfill_fts)
+
+    p = sub.add_parser("retranscribe", help="re-run Whisper over the audio archive")
+    p.add_argument("dirs", nargs="*", help="audio directories (default: audio/ and data/audio/)")
+    p.add_argument("--model", default="small")
+    p.add_argument("--device", default="cpu")
+    p.add_argument("--compute-type", default="int8")
+    p.add_argument("--workers", type=int, help="processes (default: cores / threads)")
+    p.add_argument("--threads", type=int, default=2, help="CPU threads per process")
+    p.add_argument("--batch-size", type=int, default=8)
+    p.add_argument("--commit-every", type=int, default=50)
+    p.add_argument("--checkpoint", help="progress file used to resume")
+    p.add_argument("--resummarize", action="store_true",
+                   help="reset summaries so the runner regenerates them")
+    p.add_argument("--limit", type=int, help="stop after this many files")
+    p.set_defaults(func=retranscribe)
+
+    p = sub.add_parser("import", help="merge data/history.json and server.py's notes.db into records.db")
+    p.add_argument("--history", default=os.path.join(storage.BASE_DIR, "data", "history.json"))
+    p.add_argument("--notes", default=os.path.join(os.path.dirname(storage.BASE_DIR), "notes.db"))
+    p.add_argument("--patient-id", default="UNKNOWN", help="for records that have none")
+    p.add_argument("--batch-size", type=int, default=20000, help="rows per transaction")
+    p.add_argument("--search", action="append", help="extra directory to look for audio in")
+    p.add_argument("--keep-fts-triggers", action="store_true",
+                   help="index row by row instead of one rebuild at the end "
+                        "(use when the API is running)")
+    p.set_defaults(func=import_legacy)
+
+    p = sub.add_parser("retention", help="sweep orphaned audio, apply retention policies, compact the DB")
+    p.add_argument("--policies", help='e.g. "failed:delete:90,*:archive:30" (default: RETENTION_POLICIES)')
+    p.add_argument("--sweep-orphans", action="store_true",
+                   help="delete files in AUDIO_DIR that no session refers to")
+    p.add_argument("--orphan-grace-hours", type=float, default=6)
+    p.add_argument("--io-mbps", type=float, default=0, help="throttle file I/O (0 = unthrottled)")
+    p.add_argument("--vacuum", action="store_true", help="also VACUUM records.db")
+    p.add_argument("--dry-run", action="store_true", help="report what would change")
+    p.set_defaults(func=retention)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
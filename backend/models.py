@@ -0,0 +1,295 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# smallest to largest; the router only ever steps along this list
+TIERS = ["tiny", "base", "small", "medium"]
+
+# rough resident size at float16, in MB (weights + decoder buffers)
+MODEL_MEMORY_MB = {
+    "tiny": 75,
+    "base": 145,
+    "small": 485,
+    "medium": 1530,
+    "large-v3": 3100,
+}
+
+COMPUTE_FACTOR = {
+    "int8": 0.5,
+    "int8_float16": 0.55,
+    "int8_float32": 0.55,
+    "float16": 1.0,
+    "float32": 2.0,
+}
+
+
+def detect_device():
+    # ctranslate2 ships with faster_whisper and answers this without importing torch
+    import ctranslate2
+
+    if ctranslate2.get_cuda_device_count() > 0:
+        return "cuda", "float16"
+    return "cpu", "int8"
+
+
+def estimate_mb(name, compute_type):
+    return MODEL_MEMORY_MB.get(name, 1000) * COMPUTE_FACTOR.get(compute_type, 1.0)
+
+
+class ModelRegistry:
+    """
+    Process-wide Whisper models keyed by (name, compute_type).
+
+    Every model is shared by all worker threads; `num_workers` lets
+    ctranslate2 run that many transcriptions on it concurrently. Models
+    are loaded on first use (the default one in the background at startup)
+    and must fit in `memory_mb`: when a new one doesn't, idle models are
+    evicted least-recently-used first. The default model is pinned. A
+    short warm-up inference runs before a model is handed out.
+
+    `factory(name, device, compute_type, num_workers)` replaces
+    faster_whisper.WhisperModel when set (benchmarks use a fake model).
+    """
+
+    def __init__(
+        self,
+        default,
+        device=None,
+        compute_type=None,
+        num_workers=1,
+        memory_mb=4096,
+        factory=None
+    ):
+        self.default = default
+        self.factory = factory
+        self.device = device
+        self.compute_type = compute_type
+        self.num_workers = num_workers
+        self.memory_mb = memory_mb
+
+        self.models = {}
+        self.refs = {}
+        self.last_used = {}
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.ready = threading.Event()
+        self.error = None
+        self.timings = {}
+        self.evictions = 0
+
+    def resolve_device(self):
+        if self.device is None:
+            self.device, detected = detect_device()
+            self.compute_type = self.compute_type or detected
+
+    def spec(self, name=None, compute_type=None):
+        self.resolve_device()
+        return name or self.default, compute_type or self.compute_type
+
+    @property
+    def default_spec(self):
+        return self.spec()
+
+    def used_mb(self):
+        return sum(estimate_mb(*s) for s in self.models)
+
+    # ---------- access ----------
+
+    def get(self, name=None, compute_type=None):
+        with self.use((name, compute_type)) as model:
+            return model
+
+    @contextmanager
+    def use(self, spec=None):
+        """Borrow a model for one job; in-use models are never evicted."""
+        spec = self.spec(*spec) if spec else self.default_spec
+        spec, model = self._acquire(spec)
+        try:
+            yield model
+        finally:
+            with self.lock:
+                self.refs[spec] -= 1
+                self.last_used[spec] = time.time()
+
+    def _checkout(self, spec):
+        model = self.models.get(spec)
+        if model is not None:
+            self.refs[spec] = self.refs.get(spec, 0) + 1
+        return model
+
+    def _acquire(self, spec):
+        with self.lock:
+            model = self._checkout(spec)
+        if model is not None:
+            return spec, model
+
+        with self.load_lock:
+            with self.lock:
+                model = self._checkout(spec)
+            if model is not None:
+                return spec, model
+
+            if not self._make_room(spec):
+                if spec == self.default_spec:
+                    raise MemoryError(f"No room to load {spec} within {self.memory_mb} MB")
+                print(f"No memory for Whisper {spec}, using {self.default_spec}")
+                fallback = True
+            else:
+                fallback = False
+                model = self._load(*spec)
+
+                with self.lock:
+                    self.models[spec] = model
+                    self.refs[spec] = 1
+                    self.last_used[spec] = time.time()
+
+        if fallback:
+            return self._acquire(self.default_spec)
+        return spec, model
+
+    def _make_room(self, spec):
+        needed = estimate_mb(*spec)
+
+        with self.lock:
+            idle = [
+                s for s in self.models
+                if self.refs.get(s, 0) == 0 and s != self.default_spec
+            ]
+            # don't evict anything if the new model can't fit even then
+            if self.used_mb() - sum(estimate_mb(*s) for s in idle) + needed > self.memory_mb:
+                return False
+
+            while self.used_mb() + needed > self.memory_mb:
+                victim = min(idle, key=lambda s: self.last_used.get(s, 0))
+                idle.remove(victim)
+                del self.models[victim]
+                self.refs.pop(victim, None)
+                self.last_used.pop(victim, None)
+                self.evictions += 1
+                print("Evicted Whisper model:", victim)
+
+        return True
+
+    def _load(self, name, compute_type):
+        if self.factory:
+            make = self.factory
+        else:
+            from faster_whisper import WhisperModel
+
+            def make(name, device, compute_type, num_workers):
+                return WhisperModel(
+                    name,
+                    device=device,
+                    compute_type=compute_type,
+                    num_workers=num_workers
+                )
+
+        label = f"{name}/{compute_type}"
+        start = time.time()
+        model = make(name, self.device, compute_type, self.num_workers)
+        self.timings[f"load_{label}"] = round(time.time() - start, 3)
+
+        start = time.time()
+        self._warm_up(model)
+        self.timings[f"warmup_{label}"] = round(time.time() - start, 3)
+
+        print(f"Whisper {label} ready on {self.device}:",
+              self.timings[f"load_{label}"], "s load,",
+              self.timings[f"warmup_{label}"], "s warm-up")
+        return model
+
+    @staticmethod
+    def _warm_up(model):
+        silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+        segments, _ = model.transcribe(silence, beam_size=1)
+        for _ in segments:
+            pass
+
+    def preload(self, on_ready=None):
+        """Load the default model in a background thread and flag readiness."""
+        def run():
+            try:
+                self.get()
+                self.ready.set()
+                if on_ready:
+                    on_ready()
+            except Exception as e:
+                print("Model load failed:", e)
+                self.error = str(e)
+
+        t = threading.Thread(target=run, name="model-preload", daemon=True)
+        t.start()
+        return t
+
+    def status(self):
+        with self.lock:
+            loaded = [
+                {"model": n, "compute_type": c, "in_use": self.refs.get((n, c), 0),
+                 "est_mb": round(estimate_mb(n, c))}
+                for n, c in self.models
+            ]
+        return {
+            "ready": self.ready.is_set(),
+            "error": self.error,
+            "device": self.device,
+            "compute_type": self.compute_type,
+            "loaded": loaded,
+            "memory_mb": self.memory_mb,
+            "evictions": self.evictions,
+            "timings": self.timings
+        }
+
+
+class ModelRouter:
+    """
+    Picks a Whisper model per job from the audio duration, the current
+    queue depth and an optional quality hint ("fast", "balanced",
+    "accurate"). As the queue fills, jobs step down to smaller int8 models
+    so waiting time stays bounded. Long consults step down earlier because
+    they hold a worker the longest.
+    """
+
+    def __init__(self, registry, allowed=None, max_queue=8, long_seconds=600):
+        self.registry = registry
+        self.tiers = [t for t in TIERS if not allowed or t in allowed]
+        if registry.default not in self.tiers:
+            self.tiers.append(registry.default)
+        self.max_queue = max_queue
+        self.long_seconds = long_seconds
+
+    def _target(self, quality):
+        wanted = {"fast": "base", "accurate": "medium"}.get(quality, self.registry.default)
+        if wanted in self.tiers:
+            return self.tiers.index(wanted)
+        # nearest smaller tier that is allowed
+        rank = TIERS.index(wanted) if wanted in TIERS else len(TIERS)
+        smaller = [i for i, t in enumerate(self.tiers) if t in TIERS and TIERS.index(t) < rank]
+        return smaller[-1] if smaller else self.tiers.index(self.registry.default)
+
+    def preferred(self, quality=None):
+        """The model an idle node would use; what results are cached under."""
+        return self.registry.spec(self.tiers[self._target(quality)])
+
+    def choose(self, duration, queue_depth, quality=None):
+        idx = self._target(quality)
+        compute_type = self.registry.compute_type
+        load = queue_depth / max(self.max_queue, 1)
+
+        step = 0
+        if load >= 0.75:
+            step = 2
+        elif load >= 0.4:
+            step = 1
+
+        if duration >= self.long_seconds and quality != "accurate" and load >= 0.2:
+            step += 1
+
+        if step:
+            idx = max(0, idx - step)
+            compute_type = "int8"
+
+        return self.registry.spec(self.tiers[idx], compute_type)
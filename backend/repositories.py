@@ -0,0 +1,212 @@
+import sqlite3
+import time
+
+import storage
+
+# list views skip the transcript/summary bodies unless view=full
+SLIM_COLUMNS = "id, patient_id, audio_file, timestamp, status"
+FULL_COLUMNS = SLIM_COLUMNS + ", transcript, summary"
+
+# rows never updated since insert have no version yet
+VERSION = "COALESCE(updated_at, 0)"
+
+AUDIT_COLUMNS = "id, user_email, action, patient_id, session_id, timestamp"
+
+
+def prefix_upper_bound(prefix):
+    # smallest string greater than every string starting with prefix
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def write_session(sid, patient_id, transcript, audio_path, duration=None, samples=None, segments=None):
+    """
+    Insert a transcribed session, pending its summary. Resumable uploads
+    already have a row (status 'transcribing'), so this is an upsert.
+    Synchronous: worker threads call it directly, routes go through
+    SessionRepository.save_transcript.
+    """
+    storage.execute(
+        "INSERT INTO sessions (id, patient_id, transcript, summary, audio_file, timestamp, status, duration, samples, segments) "
+        "VALUES (?,?,?,?,?,?,?,?,?,?) "
+        "ON CONFLICT(id) DO UPDATE SET transcript=excluded.transcript, "
+        "summary=excluded.summary, audio_file=excluded.audio_file, "
+        "timestamp=excluded.timestamp, status=excluded.status, "
+        "duration=excluded.duration, samples=excluded.samples, "
+        "segments=excluded.segments",
+        (
+            sid,
+            patient_id,
+            transcript,
+            "",                 # summary empty until the runner fills it
+            audio_path,
+            int(time.time()),
+            "pending",
+            duration,
+            samples,
+            segments
+        )
+    )
+
+
+def keyset_page(sql, where, params, cursor, limit):
+    """Append the (timestamp, id) cursor, ordering and limit+1 to a query."""
+    if cursor:
+        where.append("(timestamp, id) < (?, ?)")
+        params += list(cursor)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+    return sql, params
+
+
+class SessionRepository:
+
+    def __init__(self, db, hidden_statuses=()):
+        self.db = db
+        self.hidden_statuses = tuple(hidden_statuses)
+
+    async def get(self, sid, full=True):
+        columns = FULL_COLUMNS if full else SLIM_COLUMNS
+        return await self.db.query_one(
+            f"SELECT {columns} FROM sessions WHERE id=?", (sid,)
+        )
+
+    async def version(self, sid):
+        row = await self.db.query_one(
+            f"SELECT {VERSION} FROM sessions WHERE id=?", (sid,)
+        )
+        return row[0] if row else None
+
+    async def summary_state(self, sid):
+        return await self.db.query_one(
+            f"SELECT summary, status, {VERSION} FROM sessions WHERE id=?", (sid,)
+        )
+
+    async def segments(self, sid):
+        return await self.db.query_one(
+            "SELECT segments, duration FROM sessions WHERE id=?", (sid,)
+        )
+
+    def _page_query(self, columns, pid, match, cursor, limit):
+        where, params = [], []
+
+        if self.hidden_statuses:
+            where.append(f"status NOT IN ({','.join('?' * len(self.hidden_statuses))})")
+            params += self.hidden_statuses
+
+        if pid:
+            if match == "exact":
+                where.append("patient_id = ?")
+                params.append(pid)
+            else:
+                where.append("patient_id >= ? AND patient_id < ?")
+                params += [pid, prefix_upper_bound(pid)]
+
+        return keyset_page(f"SELECT {columns} FROM sessions", where, params, cursor, limit)
+
+    async def page(self, pid="", match="prefix", cursor=None, limit=50, full=False):
+        """
+        Keyset-paginated sessions, newest first; returns up to limit+1 rows
+        so the caller can tell whether there is a next page. Sorting on
+        (timestamp, id) keeps pages stable when rows share a timestamp,
+        and both the patient filter and the cursor are range predicates
+        the indexes can serve.
+        """
+        columns = FULL_COLUMNS if full else SLIM_COLUMNS
+        sql, params = self._page_query(columns, pid, match, cursor, limit)
+        return await self.db.query_all(sql, params)
+
+    async def page_versions(self, pid="", match="prefix", cursor=None, limit=50):
+        """(id, timestamp, version) of the rows page() would return, without the text."""
+        sql, params = self._page_query(f"id, timestamp, {VERSION}", pid, match, cursor, limit)
+        return await self.db.query_all(sql, params)
+
+    async def search(self, match, patient_id=None, limit=20, offset=0):
+        """FTS5 search, best match first; raises sqlite3.OperationalError on a bad query."""
+        sql = """
+            SELECT s.id, s.patient_id, s.timestamp, s.status,
+                   snippet(sessions_fts, 0, '<mark>', '</mark>', '…', 12),
+                   snippet(sessions_fts, 1, '<mark>', '</mark>', '…', 12),
+                   bm25(sessions_fts)
+            FROM sessions_fts
+            JOIN sessions s ON s.rowid = sessions_fts.rowid
+            WHERE sessions_fts MATCH ?
+        """
+        params = [match]
+
+        if patient_id:
+            sql += " AND s.patient_id = ?"
+            params.append(patient_id)
+
+        sql += " ORDER BY bm25(sessions_fts) LIMIT ? OFFSET ?"
+        params += [limit + 1, offset]
+        return await self.db.query_all(sql, params)
+
+    async def delete(self, sid):
+        """Delete a session; returns its audio_file (or None)."""
+        def run():
+            with storage.transaction() as conn:
+                row = conn.execute(
+                    "SELECT audio_file FROM sessions WHERE id=?", (sid,)
+                ).fetchone()
+                conn.execute("DELETE FROM sessions WHERE id=?", (sid,))
+            return row[0] if row else None
+
+        return await self.db.write(run)
+
+    async def save_transcript(self, sid, patient_id, transcript, audio_path,
+                              duration=None, samples=None, segments=None):
+        return await self.db.write(
+            write_session, sid, patient_id, transcript, audio_path, duration, samples, segments
+        )
+
+
+class UserRepository:
+
+    def __init__(self, db):
+        self.db = db
+
+    async def by_email(self, email):
+        return await self.db.query_one("SELECT * FROM users WHERE email=?", (email,))
+
+    async def exists(self, email):
+        return await self.db.query_one("SELECT 1 FROM users WHERE email=?", (email,)) is not None
+
+    async def create(self, email, password_hash, role="doctor", verified=0):
+        """Returns False if the email is already registered."""
+        try:
+            await self.db.execute(
+                "INSERT INTO users(email,password,role,verified) VALUES (?,?,?,?)",
+                (email, password_hash, role, verified)
+            )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    async def set_password(self, email, password_hash):
+        return await self.db.execute(
+            "UPDATE users SET password=? WHERE email=?", (password_hash, email)
+        )
+
+
+class AuditRepository:
+
+    def __init__(self, db):
+        self.db = db
+
+    async def page(self, since=None, until=None, cursor=None, limit=50):
+        """Audit entries newest first within [since, until); limit+1 rows."""
+        where, params = [], []
+
+        if since is not None:
+            where.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("timestamp < ?")
+            params.append(until)
+
+        sql, params = keyset_page(
+            f"SELECT {AUDIT_COLUMNS} FROM audit_logs", where, params, cursor, limit
+        )
+        return await self.db.query_all(sql, params)
@@ -0,0 +1,386 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+
+import storage
+
+DAY = 86400
+
+# audio in these states belongs to work still in progress
+ACTIVE_STATUSES = ("uploading", "transcribing", "processing")
+
+# already-compressed codecs gain nothing from deflate
+STORED_EXTENSIONS = (".opus", ".webm", ".ogg", ".mp3", ".m4a")
+
+
+class Policy:
+    """`status:action:days` — e.g. `failed:delete:90` or `*:archive:30`."""
+
+    ACTIONS = ("archive", "delete_audio", "delete")
+
+    def __init__(self, status, action, days):
+        if action not in self.ACTIONS:
+            raise ValueError(f"unknown retention action: {action}")
+        self.status = status
+        self.action = action
+        self.days = days
+
+    def __repr__(self):
+        return f"{self.status}:{self.action}:{self.days}"
+
+
+def parse_policies(spec):
+    policies = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        status, action, days = part.split(":")
+        policies.append(Policy(status, action, float(days)))
+    return policies
+
+
+class Throttle:
+    """Caps background I/O at `bytes_per_sec` by sleeping between chunks."""
+
+    def __init__(self, bytes_per_sec):
+        self.rate = bytes_per_sec
+        self.start = time.monotonic()
+        self.done = 0
+
+    def consume(self, n):
+        if not self.rate:
+            return
+        self.done += n
+        ahead = self.done / self.rate - (time.monotonic() - self.start)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+class RetentionManager:
+    """
+    Background retention for recordings and records.db.
+
+    Each run, on a low-priority thread with throttled file I/O:
+      - if `orphan_grace` is set, deletes audio files no session refers to
+        once they are that old, so files of jobs still being saved are
+        left alone (off by default: AUDIO_DIR may hold files, like the
+        sample recordings, that were never sessions);
+      - applies the age/status policies in order: `archive` moves the
+        recording into a compressed bundle, `delete_audio` drops the
+        recording, `delete` removes the session and its recording;
+      - drops restored copies of archived audio nobody has asked for lately;
+      - compacts bundles: members whose index row is gone (deleted
+        session, `delete`/`delete_audio` policy, orphan) are purged by
+        rewriting the bundle, and bundles left empty are removed;
+      - checkpoints the WAL and refreshes planner stats, and every
+        `vacuum_interval` seconds VACUUMs the database.
+
+    Bundles are zip files under `archive_dir`, only ever replaced whole
+    (tmp file + os.replace), so readers need no locking. `locate()`
+    serves /audio: it extracts an archived file into `restore_dir` on
+    first access.
+    """
+
+    def __init__(
+        self,
+        audio_dir,
+        archive_dir,
+        restore_dir,
+        policies,
+        interval=3600,
+        orphan_grace=None,
+        restore_ttl=DAY,
+        io_bytes_per_sec=5 * 1024 * 1024,
+        vacuum_interval=7 * DAY,
+        batch_size=500,
+        on_delete=None
+    ):
+        self.audio_dir = audio_dir
+        self.archive_dir = archive_dir
+        self.restore_dir = restore_dir
+        self.policies = policies
+        self.interval = interval
+        self.orphan_grace = orphan_grace
+        self.restore_ttl = restore_ttl
+        self.io_bytes_per_sec = io_bytes_per_sec
+        self.vacuum_interval = vacuum_interval
+        self.batch_size = batch_size
+        self.on_delete = on_delete
+
+        self.stopping = threading.Event()
+        self.thread = None
+        self.last_vacuum = time.time()
+        self.last_run = None
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        os.makedirs(self.restore_dir, exist_ok=True)
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="retention", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(timeout=30)
+            self.thread = None
+
+    def _run(self):
+        try:
+            # Linux schedules threads individually, so this only lowers this one
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+        except (AttributeError, OSError):
+            pass
+
+        # first pass after one interval, not during startup
+        while not self.stopping.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print("Retention run failed:", e)
+
+    # ---------- a full pass ----------
+
+    def run_once(self, dry_run=False):
+        start = time.time()
+        report = {
+            "orphans_removed": self.sweep_orphans(dry_run),
+            "restores_dropped": 0 if dry_run else self.drop_restores(),
+        }
+        for policy in self.policies:
+            report[repr(policy)] = self.apply(policy, dry_run)
+
+        if not dry_run:
+            report["bundles_compacted"], report["bundles_removed"] = self.compact_bundles()
+            vacuum = time.time() - self.last_vacuum >= self.vacuum_interval
+            report["maintenance"] = storage.maintenance(vacuum=vacuum)
+            if vacuum:
+                self.last_vacuum = time.time()
+
+        report["seconds"] = round(time.time() - start, 2)
+        self.last_run = report
+        print("Retention:", report)
+        return report
+
+    # ---------- orphans ----------
+
+    def referenced(self):
+        rows = storage.query_all(
+            "SELECT audio_file FROM sessions WHERE audio_file IS NOT NULL"
+        )
+        return {os.path.basename(r[0]) for r in rows}
+
+    def sweep_orphans(self, dry_run=False):
+        referenced = self.referenced()
+        removed = 0
+
+        for entry in os.scandir(self.audio_dir) if self.orphan_grace is not None else ():
+            if self.stopping.is_set():
+                break
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            if entry.name in referenced or entry.stat().st_mtime > time.time() - self.orphan_grace:
+                continue
+            if not dry_run:
+                os.remove(entry.path)
+            removed += 1
+
+        # archive entries whose session is gone; compact_bundles purges the bytes
+        if not dry_run:
+            archived = storage.query_all("SELECT filename FROM audio_archive")
+            gone = [(name,) for (name,) in archived if name not in referenced]
+            if gone:
+                storage.executemany("DELETE FROM audio_archive WHERE filename=?", gone)
+                removed += len(gone)
+
+        return removed
+
+    # ---------- policies ----------
+
+    def candidates(self, policy):
+        cutoff = int(time.time() - policy.days * DAY)
+        sql = (
+            "SELECT id, audio_file FROM sessions WHERE timestamp < ? "
+            f"AND status NOT IN ({','.join('?' * len(ACTIVE_STATUSES))})"
+        )
+        params = [cutoff, *ACTIVE_STATUSES]
+        if policy.status != "*":
+            sql += " AND status = ?"
+            params.append(policy.status)
+        if policy.action != "delete":
+            sql += " AND audio_file IS NOT NULL"
+        return storage.query_all(sql, params)
+
+    def apply(self, policy, dry_run=False):
+        rows = self.candidates(policy)
+        if policy.action == "archive":
+            archived = {r[0] for r in storage.query_all("SELECT filename FROM audio_archive")}
+            files = []
+            for sid, audio in rows:
+                name = os.path.basename(audio)
+                path = os.path.join(self.audio_dir, name)
+                if name not in archived and os.path.isfile(path):
+                    files.append(path)
+            if dry_run:
+                return len(files)
+            done = 0
+            for i in range(0, len(files), self.batch_size):
+                if self.stopping.is_set():
+                    break
+                done += self.archive(files[i:i + self.batch_size])
+            return done
+
+        if dry_run:
+            return len(rows)
+
+        done = 0
+        for sid, audio in rows:
+            if self.stopping.is_set():
+                break
+            if policy.action == "delete":
+                storage.execute("DELETE FROM sessions WHERE id=?", (sid,))
+                if self.on_delete:
+                    self.on_delete(sid)
+            else:
+                storage.execute("UPDATE sessions SET audio_file=NULL WHERE id=?", (sid,))
+            if audio:
+                self.remove_audio(os.path.basename(audio))
+            done += 1
+        return done
+
+    # ---------- archive bundles ----------
+
+    def archive(self, paths):
+        """Write `paths` into one new bundle, index them, then delete the originals."""
+        name = f"audio-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.zip"
+        bundle = os.path.join(self.archive_dir, name)
+        tmp = bundle + ".tmp"
+        throttle = Throttle(self.io_bytes_per_sec)
+
+        with zipfile.ZipFile(tmp, "w", allowZip64=True) as zf:
+            for path in paths:
+                compress = (
+                    zipfile.ZIP_STORED if path.endswith(STORED_EXTENSIONS)
+                    else zipfile.ZIP_DEFLATED
+                )
+                info = zipfile.ZipInfo.from_file(path, os.path.basename(path))
+                info.compress_type = compress
+                with open(path, "rb") as src, zf.open(info, "w") as dst:
+                    while True:
+                        chunk = src.read(256 * 1024)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+                        throttle.consume(len(chunk))
+
+        os.replace(tmp, bundle)
+
+        now = int(time.time())
+        storage.executemany(
+            "INSERT OR REPLACE INTO audio_archive(filename, bundle, archived_at) VALUES (?,?,?)",
+            [(os.path.basename(p), name, now) for p in paths]
+        )
+        for path in paths:
+            os.remove(path)
+        return len(paths)
+
+    def compact_bundles(self):
+        """
+        Drop bundle members that are no longer indexed: rewrite the bundle
+        without them, or delete it when nothing in it is indexed any more.
+        Returns (rewritten, removed).
+        """
+        indexed = {}
+        for name, bundle in storage.query_all("SELECT filename, bundle FROM audio_archive"):
+            indexed.setdefault(bundle, set()).add(name)
+
+        rewritten = removed = 0
+        throttle = Throttle(self.io_bytes_per_sec)
+
+        for entry in os.scandir(self.archive_dir):
+            if self.stopping.is_set():
+                break
+            if not entry.is_file() or not entry.name.endswith(".zip"):
+                continue
+
+            keep = indexed.get(entry.name, set())
+            if not keep:
+                os.remove(entry.path)
+                removed += 1
+                continue
+
+            with zipfile.ZipFile(entry.path) as src:
+                members = src.infolist()
+                if all(m.filename in keep for m in members):
+                    continue
+
+                tmp = entry.path + ".tmp"
+                with zipfile.ZipFile(tmp, "w", allowZip64=True) as dst:
+                    for info in members:
+                        if info.filename not in keep:
+                            continue
+                        with src.open(info) as r, dst.open(info, "w") as w:
+                            while True:
+                                chunk = r.read(256 * 1024)
+                                if not chunk:
+                                    break
+                                w.write(chunk)
+                                throttle.consume(len(chunk))
+
+            os.replace(tmp, entry.path)
+            rewritten += 1
+
+        return rewritten, removed
+
+    def locate(self, filename):
+        """Path to serve `filename` from: AUDIO_DIR, or a restored archive copy."""
+        path = os.path.join(self.audio_dir, filename)
+        if os.path.exists(path):
+            return path
+
+        restored = os.path.join(self.restore_dir, filename)
+        if os.path.exists(restored):
+            os.utime(restored)          # keeps it out of drop_restores
+            return restored
+
+        row = storage.query_one(
+            "SELECT bundle FROM audio_archive WHERE filename=?", (filename,)
+        )
+        if not row:
+            return path                 # let the caller 404
+
+        tmp = f"{restored}.{uuid.uuid4().hex}.tmp"
+        try:
+            with zipfile.ZipFile(os.path.join(self.archive_dir, row[0])) as zf:
+                with zf.open(filename) as src, open(tmp, "wb") as dst:
+                    shutil.copyfileobj(src, dst, 256 * 1024)
+        except (FileNotFoundError, KeyError):
+            # deleted (and compacted away) after the index lookup
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return path
+        os.replace(tmp, restored)
+        return restored
+
+    def remove_audio(self, filename):
+        # an archived copy loses its index row here; compact_bundles purges it next run
+        for d in (self.audio_dir, self.restore_dir):
+            path = os.path.join(d, filename)
+            if os.path.exists(path):
+                os.remove(path)
+        storage.execute("DELETE FROM audio_archive WHERE filename=?", (filename,))
+
+    def drop_restores(self):
+        cutoff = time.time() - self.restore_ttl
+        dropped = 0
+        for entry in os.scandir(self.restore_dir):
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                dropped += 1
+        return dropped
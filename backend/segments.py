@@ -0,0 +1,221 @@
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_right
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+UNKNOWN, DOCTOR, PATIENT = 0, 1, 2
+SPEAKERS = {UNKNOWN: None, DOCTOR: "doctor", PATIENT: "patient"}
+
+MAGIC = b"SEG1"
+HEADER = struct.Struct("<4sII")
+
+
+# ---------- packing ----------
+
+def _column(typecode, values):
+    col = array(typecode, values)
+    if sys.byteorder == "big":
+        col.byteswap()
+    return col.tobytes()
+
+
+def _read_column(typecode, data, offset, count):
+    col = array(typecode)
+    end = offset + col.itemsize * count
+    col.frombytes(data[offset:end])
+    if sys.byteorder == "big":
+        col.byteswap()
+    return col, end
+
+
+def _texts(texts):
+    encoded = [t.encode("utf-8") for t in texts]
+    ends, pos = [], 0
+    for t in encoded:
+        pos += len(t)
+        ends.append(pos)
+    return ends, b"".join(encoded)
+
+
+def pack(segments, words=None):
+    """
+    Pack segments (and optional words) into one blob for sessions.segments.
+
+    Layout, little-endian: header (magic, segment count, word count), then
+    one array per column — start_ms, end_ms, speaker, text end offsets —
+    then the same for words plus each word's segment index, then all text
+    as zlib-compressed UTF-8. A 30 minute dictation packs into a few KB
+    instead of thousands of rows.
+    """
+    words = words or []
+
+    seg_ends, seg_text = _texts(s["text"] for s in segments)
+    word_ends, word_text = _texts(w["text"] for w in words)
+
+    parts = [
+        HEADER.pack(MAGIC, len(segments), len(words)),
+        _column("I", (round(s["start"] * 1000) for s in segments)),
+        _column("I", (round(s["end"] * 1000) for s in segments)),
+        _column("B", (s.get("speaker", UNKNOWN) for s in segments)),
+        _column("I", seg_ends),
+        _column("I", (round(w["start"] * 1000) for w in words)),
+        _column("I", (round(w["end"] * 1000) for w in words)),
+        _column("I", (w["segment"] for w in words)),
+        _column("I", word_ends),
+        zlib.compress(seg_text + word_text)
+    ]
+    return b"".join(parts)
+
+
+def unpack(blob, with_words=False):
+    """Inverse of pack: returns (segments, words); words is [] unless asked for."""
+    magic, n_seg, n_words = HEADER.unpack_from(blob, 0)
+    if magic != MAGIC:
+        raise ValueError("not a segment index")
+
+    pos = HEADER.size
+    seg_start, pos = _read_column("I", blob, pos, n_seg)
+    seg_end, pos = _read_column("I", blob, pos, n_seg)
+    seg_speaker, pos = _read_column("B", blob, pos, n_seg)
+    seg_ends, pos = _read_column("I", blob, pos, n_seg)
+    word_start, pos = _read_column("I", blob, pos, n_words)
+    word_end, pos = _read_column("I", blob, pos, n_words)
+    word_seg, pos = _read_column("I", blob, pos, n_words)
+    word_ends, pos = _read_column("I", blob, pos, n_words)
+
+    text = zlib.decompress(blob[pos:])
+    seg_bytes = seg_ends[-1] if n_seg else 0
+
+    segments, prev = [], 0
+    for i in range(n_seg):
+        segments.append({
+            "start": seg_start[i] / 1000,
+            "end": seg_end[i] / 1000,
+            "speaker": SPEAKERS.get(seg_speaker[i]),
+            "text": text[prev:seg_ends[i]].decode("utf-8")
+        })
+        prev = seg_ends[i]
+
+    words = []
+    if with_words:
+        prev = 0
+        for i in range(n_words):
+            words.append({
+                "start": word_start[i] / 1000,
+                "end": word_end[i] / 1000,
+                "segment": word_seg[i],
+                "text": text[seg_bytes + prev:seg_bytes + word_ends[i]].decode("utf-8")
+            })
+            prev = word_ends[i]
+
+    return segments, words
+
+
+def locate(segments, offset):
+    """Index of the segment playing at `offset` seconds (or the one before it)."""
+    starts = [s["start"] for s in segments]
+    return max(bisect_right(starts, offset) - 1, 0) if segments else None
+
+
+def from_whisper(segments, with_words=False):
+    """Flatten faster_whisper segments into (segments, words) dicts."""
+    segs, words = [], []
+    for s in segments:
+        index = len(segs)
+        segs.append({"start": s.start, "end": s.end, "text": s.text})
+        if with_words and s.words:
+            for w in s.words:
+                words.append({
+                    "start": w.start, "end": w.end, "text": w.word, "segment": index
+                })
+    return segs, words
+
+
+# ---------- diarization ----------
+
+FRAME = 400         # 25 ms
+HOP = 160           # 10 ms
+BANDS = 24
+
+
+def _voice_features(pcm):
+    """Mean and spread of log band energies: a cheap per-segment voiceprint."""
+    if len(pcm) < FRAME:
+        pcm = np.pad(pcm, (0, FRAME - len(pcm)))
+
+    count = 1 + (len(pcm) - FRAME) // HOP
+    idx = np.arange(FRAME)[None, :] + HOP * np.arange(count)[:, None]
+    frames = pcm[idx] * np.hanning(FRAME)
+
+    spectrum = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+    # log-spaced bands between ~80 Hz and 8 kHz, roughly mel-like
+    edges = np.unique(np.geomspace(2, spectrum.shape[1] - 1, BANDS + 1).astype(int))
+    bands = np.stack(
+        [spectrum[:, a:b].sum(axis=1) for a, b in zip(edges[:-1], edges[1:])], axis=1
+    )
+    logs = np.log(bands + 1e-10)
+
+    # drop near-silent frames so pauses don't dominate the voiceprint
+    energy = logs.mean(axis=1)
+    voiced = logs[energy > np.percentile(energy, 30)] if len(logs) > 3 else logs
+    return np.concatenate([voiced.mean(axis=0), voiced.std(axis=0)])
+
+
+def diarize(pcm, segments, min_separation=1.5, iterations=20):
+    """
+    Label each segment doctor or patient, in place, on the CPU.
+
+    Segments are clustered into two voices with k-means on spectral
+    features. The voice with more total speaking time is taken to be the
+    doctor (this is dictation software). If the two clusters aren't
+    clearly apart, everything is labelled doctor.
+    """
+    for s in segments:
+        s["speaker"] = DOCTOR
+
+    if len(segments) < 2:
+        return segments
+
+    feats = []
+    for s in segments:
+        a = int(s["start"] * SAMPLE_RATE)
+        b = max(int(s["end"] * SAMPLE_RATE), a + FRAME)
+        feats.append(_voice_features(pcm[a:b]))
+    feats = np.array(feats)
+    feats = (feats - feats.mean(axis=0)) / (feats.std(axis=0) + 1e-6)
+
+    # deterministic init: the two segments farthest apart
+    first = int(np.argmax(np.linalg.norm(feats - feats[0], axis=1)))
+    second = int(np.argmax(np.linalg.norm(feats - feats[first], axis=1)))
+    centers = feats[[first, second]]
+
+    for _ in range(iterations):
+        dist = np.linalg.norm(feats[:, None, :] - centers[None, :, :], axis=2)
+        labels = dist.argmin(axis=1)
+        if len(set(labels)) < 2:
+            return segments
+        updated = np.stack([feats[labels == k].mean(axis=0) for k in (0, 1)])
+        if np.allclose(updated, centers):
+            break
+        centers = updated
+
+    spread = np.mean([
+        np.linalg.norm(feats[labels == k] - centers[k], axis=1).mean() for k in (0, 1)
+    ])
+    if np.linalg.norm(centers[0] - centers[1]) < min_separation * max(spread, 1e-6):
+        return segments
+
+    talk = [
+        sum(s["end"] - s["start"] for s, l in zip(segments, labels) if l == k)
+        for k in (0, 1)
+    ]
+    doctor = 0 if talk[0] >= talk[1] else 1
+    for s, l in zip(segments, labels):
+        s["speaker"] = DOCTOR if l == doctor else PATIENT
+
+    return segments
@@ -0,0 +1,278 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB = os.getenv("RECORDS_DB", os.path.join(BASE_DIR, "records.db"))
+
+BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+# per-connection cache of compiled statements, reused across calls
+STATEMENT_CACHE = 256
+
+_local = threading.local()
+
+
+def connect(path=None):
+    conn = sqlite3.connect(
+        path or DB,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE,
+        isolation_level=None,           # we issue BEGIN/COMMIT ourselves
+        check_same_thread=False
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def get_conn():
+    """One long-lived connection per thread, opened on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = connect()
+        _local.conn = conn
+        _local.depth = 0
+    return conn
+
+
+def close_conn():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+@contextmanager
+def transaction():
+    """
+    Write transaction on the thread's connection. BEGIN IMMEDIATE takes the
+    write lock up front so concurrent writers wait on busy_timeout instead
+    of failing on lock upgrade. Nested calls join the outer transaction.
+    """
+    conn = get_conn()
+
+    if _local.depth:
+        _local.depth += 1
+        try:
+            yield conn
+        finally:
+            _local.depth -= 1
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    _local.depth = 1
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        _local.depth = 0
+
+
+def execute(sql, params=()):
+    with transaction() as conn:
+        return conn.execute(sql, params)
+
+
+def executemany(sql, rows):
+    with transaction() as conn:
+        return conn.executemany(sql, rows)
+
+
+def query_one(sql, params=()):
+    return get_conn().execute(sql, params).fetchone()
+
+
+def query_all(sql, params=()):
+    return get_conn().execute(sql, params).fetchall()
+
+
+# ---------- SCHEMA ----------
+
+def ensure_columns(conn, table, columns):
+    """Add any missing columns to an existing table (lightweight migration)."""
+    existing = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+    for name, decl in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+def init_db():
+    conn = get_conn()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            patient_id TEXT,
+            transcript TEXT,
+            summary TEXT,
+            audio_file TEXT,
+            timestamp INTEGER,
+            status TEXT
+        )
+    """)
+    conn.execute("""
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT UNIQUE,
+    password TEXT,
+    role TEXT,
+    failed_attempts INTEGER DEFAULT 0,
+    locked_until INTEGER DEFAULT 0,
+    verified INTEGER DEFAULT 0
+)
+""")
+    conn.execute("""
+CREATE TABLE IF NOT EXISTS audit_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_email TEXT,
+    action TEXT,
+    patient_id TEXT,
+    session_id TEXT,
+    timestamp INTEGER
+)
+""")
+    conn.execute("""
+CREATE TABLE IF NOT EXISTS audio_archive (
+    filename TEXT PRIMARY KEY,
+    bundle TEXT,
+    archived_at INTEGER
+)
+""")
+    conn.execute("""
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    token_hash TEXT PRIMARY KEY,
+    expires_at INTEGER
+)
+""")
+    ensure_columns(conn, "sessions", {
+        "summary_attempts": "INTEGER DEFAULT 0",
+        "summary_lease_until": "INTEGER DEFAULT 0",
+        "summary_next_at": "INTEGER DEFAULT 0",
+        "summary_error": "TEXT",
+        "duration": "REAL",
+        "samples": "INTEGER",
+        "segments": "BLOB",
+        "updated_at": "INTEGER"
+    })
+
+    ensure_columns(conn, "audit_logs", {"event_id": "TEXT"})
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_audit_event ON audit_logs(event_id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_audit_ts ON audit_logs(timestamp, id)"
+    )
+
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sessions_status "
+        "ON sessions(status, summary_next_at)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sessions_patient_ts "
+        "ON sessions(patient_id, timestamp, id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sessions_ts ON sessions(timestamp, id)"
+    )
+
+    # full-text index over transcript/summary, kept in sync by triggers.
+    # External content: the text lives only in sessions, FTS maps by rowid.
+    fts_existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='sessions_fts'"
+    ).fetchone() is not None
+    conn.execute("""
+CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
+    transcript,
+    summary,
+    content='sessions',
+    content_rowid='rowid',
+    tokenize='porter unicode61'
+)
+""")
+    conn.execute("""
+CREATE TRIGGER IF NOT EXISTS sessions_fts_insert AFTER INSERT ON sessions BEGIN
+    INSERT INTO sessions_fts(rowid, transcript, summary)
+    VALUES (new.rowid, new.transcript, new.summary);
+END
+""")
+    conn.execute("""
+CREATE TRIGGER IF NOT EXISTS sessions_fts_delete AFTER DELETE ON sessions BEGIN
+    INSERT INTO sessions_fts(sessions_fts, rowid, transcript, summary)
+    VALUES ('delete', old.rowid, old.transcript, old.summary);
+END
+""")
+    conn.execute("""
+CREATE TRIGGER IF NOT EXISTS sessions_fts_update
+AFTER UPDATE OF transcript, summary ON sessions BEGIN
+    INSERT INTO sessions_fts(sessions_fts, rowid, transcript, summary)
+    VALUES ('delete', old.rowid, old.transcript, old.summary);
+    INSERT INTO sessions_fts(rowid, transcript, summary)
+    VALUES (new.rowid, new.transcript, new.summary);
+END
+""")
+
+    # row version behind the API's ETags: bumped (epoch ms, strictly
+    # increasing per row) whenever a column the API returns changes, by
+    # whichever writer changed it. Rows never updated since insert read as 0.
+    conn.execute("""
+CREATE TRIGGER IF NOT EXISTS sessions_touch
+AFTER UPDATE OF patient_id, transcript, summary, audio_file, timestamp, status,
+    duration, segments ON sessions
+WHEN new.updated_at IS old.updated_at
+BEGIN
+    UPDATE sessions SET updated_at = max(
+        COALESCE(old.updated_at, 0) + 1,
+        CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)
+    ) WHERE rowid = new.rowid;
+END
+""")
+
+    # a records.db from before FTS has rows the triggers never saw; index
+    # them now, since a 'delete' for an unindexed rowid corrupts the index
+    if not fts_existed:
+        rebuild_fts()
+
+
+def rebuild_fts():
+    """Re-index every session, e.g. for a records.db created before FTS existed."""
+    with transaction() as conn:
+        conn.execute("INSERT INTO sessions_fts(sessions_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO sessions_fts(sessions_fts) VALUES ('optimize')")
+        return conn.execute("SELECT count(*) FROM sessions").fetchone()[0]
+
+
+def maintenance(vacuum=False):
+    """
+    Routine upkeep: truncate the WAL, refresh planner statistics and,
+    when asked, VACUUM. VACUUM may renumber the rowids of sessions (its
+    key is TEXT), which the external-content FTS index relies on, so the
+    index is rebuilt afterwards.
+    """
+    conn = get_conn()
+    start = time.time()
+    report = {}
+
+    busy, log_frames, checkpointed = conn.execute(
+        "PRAGMA wal_checkpoint(TRUNCATE)"
+    ).fetchone()
+    report["wal_checkpointed"] = checkpointed
+    report["wal_busy"] = bool(busy)
+
+    conn.execute("ANALYZE")
+
+    if vacuum:
+        before = os.path.getsize(DB)
+        conn.execute("VACUUM")
+        rebuild_fts()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        report["vacuum_freed_bytes"] = before - os.path.getsize(DB)
+
+    report["seconds"] = round(time.time() - start, 2)
+    return report
+
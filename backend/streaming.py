@@ -0,0 +1,200 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# how often a new decode pass is attempted while audio keeps arriving
+STEP_SECONDS = 2.0
+# silence that closes an utterance and makes it safe to decode
+MIN_SILENCE_MS = 500
+# force a decode if the speaker never pauses for this long
+MAX_PENDING_SECONDS = 20.0
+
+
+class ChunkFeed:
+    """
+    Read-only file object over chunks that are still arriving: `read()`
+    blocks until there is data, and returns b"" only once `close()` has
+    been called. No seek/tell, so PyAV demuxes it as a live stream.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def write(self, data):
+        with self.cond:
+            self.buffer += data
+            self.cond.notify()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+
+    def read(self, size=-1):
+        with self.cond:
+            while not self.buffer and not self.closed:
+                self.cond.wait()
+            if size is None or size < 0:
+                size = len(self.buffer)
+            data = bytes(self.buffer[:size])
+            del self.buffer[:size]
+            return data
+
+
+class StreamingTranscriber:
+    """
+    Incremental decoder for a dictation that is still being recorded.
+
+    Browser chunks are appended to `audio_path` (kept for playback) and
+    fed to a decoder thread that holds one demuxer and resampler for the
+    whole stream, so every byte is decoded once. Each `step()` takes the
+    PCM decoded since the last commit, runs VAD over it and transcribes
+    only up to the last closed utterance, so text is emitted while the
+    clinician keeps talking.
+    """
+
+    def __init__(self, audio_path):
+        self.audio_path = audio_path
+        self.file = open(audio_path, "wb")
+        self.feed = ChunkFeed()
+        self.received = 0
+        self.committed = 0          # samples already transcribed
+        self.segments = []
+        self.last_step = 0.0
+        self.lock = threading.Lock()
+
+        # decoded PCM not yet picked up by step(), and what step() holds
+        self.decoded = []
+        self.decoded_lock = threading.Lock()
+        self.pending = np.zeros(0, dtype=np.float32)
+
+        self.decoder = threading.Thread(target=self._decode, name="stream-decode", daemon=True)
+        self.decoder.start()
+
+    def append(self, data):
+        self.file.write(data)
+        self.file.flush()
+        self.feed.write(data)
+        self.received += len(data)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+        self.feed.close()
+
+    def discard(self):
+        """Close and remove the spooled recording (nothing will be saved)."""
+        self.close()
+        if os.path.exists(self.audio_path):
+            os.remove(self.audio_path)
+
+    def due(self):
+        return self.received and time.time() - self.last_step >= STEP_SECONDS
+
+    def text(self):
+        return "".join(s["text"] for s in self.segments).strip()
+
+    def _decode(self):
+        import av
+
+        # same conversion as faster_whisper.decode_audio
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+        try:
+            with av.open(self.feed, mode="r") as container:
+                stream = container.streams.audio[0]
+                for packet in container.demux(stream):
+                    try:
+                        frames = packet.decode()
+                    except av.error.InvalidDataError:
+                        # a client that drops off can leave the last frame cut short
+                        continue
+                    for frame in frames:
+                        self._push(resampler.resample(frame))
+                self._push(resampler.resample(None))
+        except Exception as e:
+            if self.received:
+                print("Stream decode failed:", e)
+
+    def _push(self, frames):
+        for frame in frames:
+            pcm = frame.to_ndarray().reshape(-1).astype(np.float32) / 32768.0
+            with self.decoded_lock:
+                self.decoded.append(pcm)
+
+    def _take_pending(self):
+        with self.decoded_lock:
+            chunks, self.decoded = self.decoded, []
+        if chunks:
+            self.pending = np.concatenate([self.pending, *chunks])
+        return self.pending
+
+    def _cut_point(self, pending, final=False):
+        """(samples to commit, whether they hold any speech)."""
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+        speech = get_speech_timestamps(
+            pending, VadOptions(min_silence_duration_ms=MIN_SILENCE_MS)
+        )
+        guard = SAMPLE_RATE * MIN_SILENCE_MS // 1000
+
+        if not speech:
+            # only silence so far, nothing worth sending to Whisper
+            return (len(pending) if final or len(pending) > guard else 0), False
+
+        if final:
+            return len(pending), True
+
+        closed = [s for s in speech if s["end"] + guard <= len(pending)]
+        if closed:
+            return min(closed[-1]["end"] + guard // 2, len(pending)), True
+
+        if len(pending) >= MAX_PENDING_SECONDS * SAMPLE_RATE:
+            return len(pending), True
+
+        return 0, True
+
+    def step(self, model, emit, final=False):
+        """Decode the next closed chunk, calling `emit` for each new segment."""
+        with self.lock:
+            self.last_step = time.time()
+            if final:
+                # EOF for the decoder; wait for it to drain the tail
+                self.close()
+                self.decoder.join()
+
+            pending = self._take_pending()
+            if not len(pending):
+                return 0
+
+            cut, speech = self._cut_point(pending, final)
+            if not cut:
+                return 0
+            if not speech:
+                # skip past the silence without a Whisper call
+                self.committed += cut
+                self.pending = pending[cut:]
+                return 0
+
+            offset = self.committed / SAMPLE_RATE
+            segments, _ = model.transcribe(pending[:cut], vad_filter=True)
+
+            count = 0
+            for s in segments:
+                seg = {
+                    "start": round(offset + s.start, 2),
+                    "end": round(offset + s.end, 2),
+                    "text": s.text
+                }
+                self.segments.append(seg)
+                emit(seg)
+                count += 1
+
+            self.committed += cut
+            self.pending = pending[cut:]
+            return count
@@ -0,0 +1,179 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import storage
+
+FAILED_SUMMARY = "Summary unavailable."
+
+
+class SummaryRunner:
+    """
+    Background summarizer driven by the sessions.status column.
+
+    Workers claim `pending` rows by moving them to `processing` with a lease.
+    A lease that runs out (worker crashed, process killed) makes the row
+    claimable again, so nothing stays stuck in `processing`. Failures are
+    retried with exponential backoff up to `max_attempts`.
+    """
+
+    def __init__(
+        self,
+        summarize_fn,
+        workers=1,
+        lease_seconds=180,
+        max_attempts=3,
+        retry_base=10,
+        poll_interval=5,
+        on_claim=None
+    ):
+        self.summarize_fn = summarize_fn
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.poll_interval = poll_interval
+        self.on_claim = on_claim
+
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.threads = []
+        self.waiters = {}
+        self.lock = threading.Lock()
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        recovered = self.recover()
+        if recovered:
+            print("Recovered stale summaries:", recovered)
+
+        self.stopping.clear()
+        for i in range(self.workers):
+            t = threading.Thread(
+                target=self._run, name=f"summary-worker-{i}", daemon=True
+            )
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+        for t in self.threads:
+            t.join(timeout=5)
+        self.threads = []
+
+    def notify(self):
+        """Called after a session is inserted so a worker picks it up now."""
+        self.wake.set()
+
+    def recover(self):
+        now = int(time.time())
+        return storage.execute(
+            "UPDATE sessions SET status='pending', summary_next_at=? "
+            "WHERE status='processing' AND summary_lease_until < ?",
+            (now, now)
+        ).rowcount
+
+    # ---------- subscriptions ----------
+
+    def subscribe(self, sid):
+        fut = Future()
+        with self.lock:
+            self.waiters.setdefault(sid, []).append(fut)
+        return fut
+
+    def unsubscribe(self, sid, fut):
+        with self.lock:
+            futs = self.waiters.get(sid, [])
+            if fut in futs:
+                futs.remove(fut)
+            if not futs:
+                self.waiters.pop(sid, None)
+
+    def _publish(self, sid, status, summary):
+        with self.lock:
+            futs = self.waiters.pop(sid, [])
+        for fut in futs:
+            if not fut.done():
+                fut.set_result({"status": status, "summary": summary})
+
+    # ---------- workers ----------
+
+    def claim(self):
+        now = int(time.time())
+
+        with storage.transaction() as conn:
+            row = conn.execute(
+                """
+                SELECT id, transcript, summary_attempts,
+                       max(timestamp, summary_next_at) FROM sessions
+                WHERE (status='pending' AND summary_next_at <= ?)
+                   OR (status='processing' AND summary_lease_until < ?)
+                ORDER BY timestamp
+                LIMIT 1
+                """,
+                (now, now)
+            ).fetchone()
+
+            if not row:
+                return None
+
+            conn.execute(
+                "UPDATE sessions SET status='processing', summary_lease_until=?, "
+                "summary_attempts=summary_attempts+1 WHERE id=?",
+                (now + self.lease_seconds, row[0])
+            )
+
+        if self.on_claim:
+            # seconds the row sat waiting since it became eligible
+            self.on_claim(max(now - (row[3] or now), 0))
+
+        return row[0], row[1], row[2] + 1
+
+    def _run(self):
+        while not self.stopping.is_set():
+            try:
+                job = self.claim()
+            except Exception as e:
+                print("Summary claim failed:", e)
+                job = None
+
+            if not job:
+                self.wake.wait(self.poll_interval)
+                self.wake.clear()
+                continue
+
+            self._process(*job)
+
+    def _process(self, sid, transcript, attempt):
+        try:
+            summary = self.summarize_fn(transcript)
+        except Exception as e:
+            print(f"Summary attempt {attempt} failed for {sid}:", e)
+            self._fail(sid, attempt, str(e))
+            return
+
+        storage.execute(
+            "UPDATE sessions SET summary=?, status='done', summary_error=NULL, "
+            "summary_lease_until=0 WHERE id=?",
+            (summary, sid)
+        )
+        self._publish(sid, "done", summary)
+
+    def _fail(self, sid, attempt, error):
+        if attempt >= self.max_attempts:
+            storage.execute(
+                "UPDATE sessions SET summary=?, status='failed', summary_error=?, "
+                "summary_lease_until=0 WHERE id=?",
+                (FAILED_SUMMARY, error, sid)
+            )
+            self._publish(sid, "failed", FAILED_SUMMARY)
+            return
+
+        delay = self.retry_base * 2 ** (attempt - 1)
+        storage.execute(
+            "UPDATE sessions SET status='pending', summary_error=?, "
+            "summary_next_at=?, summary_lease_until=0 WHERE id=?",
+            (error, int(time.time()) + delay, sid)
+        )
@@ -0,0 +1,56 @@
+"""
+A 304 must repeat the ETag of the representation it validates: the
+gzip-suffixed tag when the client holds the compressed body, the bare
+tag when the body went out uncompressed.
+"""
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from compression import CompressionMiddleware
+from delivery import json_response, version_etag
+
+ETAG = version_etag("history", "s1:1")
+
+
+def make_client(rows):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/history")
+    def history(request: Request):
+        return json_response(request, [{"id": i, "text": "x" * 40} for i in range(rows)], ETAG)
+
+    return TestClient(app)
+
+
+def test_304_repeats_the_encoded_etag():
+    client = make_client(rows=100)
+    gzip = {"Accept-Encoding": "gzip"}
+
+    first = client.get("/history", headers=gzip)
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    tag = first.headers["etag"]
+    assert tag.endswith('-gzip"')
+
+    again = client.get("/history", headers={**gzip, "If-None-Match": tag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == tag
+
+
+def test_304_keeps_the_bare_etag_for_uncompressed_bodies():
+    client = make_client(rows=1)
+    gzip = {"Accept-Encoding": "gzip"}
+
+    first = client.get("/history", headers=gzip)
+    assert "content-encoding" not in first.headers
+    assert first.headers["etag"] == ETAG
+
+    again = client.get("/history", headers={**gzip, "If-None-Match": ETAG})
+    assert again.status_code == 304
+    assert again.headers["etag"] == ETAG
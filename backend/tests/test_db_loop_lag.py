@@ -0,0 +1,100 @@
+"""
+Event-loop lag while route-style reads and writes go through db.Database.
+
+A ticker sleeps 1 ms in a loop and records how late it wakes. With the
+DB work on the executor, p99 lag must stay under LOOP_LAG_P99_MS (the
+DB threads still share the GIL, so a few ms of lag remain; about 10 ms
+p99 on a small CI box). Running the same queries on the loop comes out
+well above it; bench/loop_lag_bench.py has the full comparison.
+"""
+import asyncio
+import os
+import random
+import time
+import uuid
+
+import pytest
+
+import storage
+from db import Database
+from repositories import SessionRepository
+
+TICK = 0.001
+ROWS = 20000
+PATIENTS = 200
+TASKS = 16
+SECONDS = 2.0
+MAX_P99_MS = float(os.getenv("LOOP_LAG_P99_MS", "15"))
+
+
+@pytest.fixture
+def records_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB", str(tmp_path / "records.db"))
+    storage.close_conn()
+    storage.init_db()
+    now = int(time.time())
+    storage.executemany(
+        "INSERT INTO sessions (id, patient_id, transcript, summary, timestamp, status) "
+        "VALUES (?,?,?,?,?,?)",
+        [
+            (str(uuid.uuid4()), f"P{i % PATIENTS:04d}",
+             "patient reports chest pain and shortness of breath " * 8,
+             "summary " * 20, now - i, "done")
+            for i in range(ROWS)
+        ]
+    )
+    yield
+    storage.close_conn()
+
+
+def p99(values):
+    values = sorted(values)
+    return values[int(0.99 * (len(values) - 1))]
+
+
+async def lag_under_load():
+    db = Database(readers=4)
+    db.start()
+    sessions = SessionRepository(db)
+    stop = asyncio.Event()
+    lags = []
+    ops = 0
+
+    async def ticker():
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - start - TICK)
+
+    async def worker(n):
+        nonlocal ops
+        rng = random.Random(n)
+        while not stop.is_set():
+            pid = f"P{rng.randrange(PATIENTS):04d}"
+            if rng.random() < 0.2:
+                await sessions.save_transcript(
+                    str(uuid.uuid4()), pid, "new dictation " * 50, None
+                )
+            else:
+                await sessions.page(pid, match="exact")
+            ops += 1
+            # lets the ticker run even if a regression makes DB calls blocking
+            await asyncio.sleep(0)
+
+    tasks = [asyncio.create_task(ticker())]
+    tasks += [asyncio.create_task(worker(n)) for n in range(TASKS)]
+    try:
+        await asyncio.sleep(SECONDS)
+    finally:
+        stop.set()
+        await asyncio.gather(*tasks)
+        db.stop()
+    return lags, ops
+
+
+def test_loop_lag_stays_low_under_db_load(records_db):
+    lags, ops = asyncio.run(lag_under_load())
+
+    assert ops > 100, "the DB load never got going"
+    lag_ms = p99(lags) * 1000
+    assert lag_ms < MAX_P99_MS, f"p99 event-loop lag {lag_ms:.1f} ms under DB load"
@@ -0,0 +1,66 @@
+"""
+A live dictation that is only silence must never reach Whisper: VAD
+finds no speech, so step() commits past it without calling the model.
+"""
+import io
+
+import pytest
+
+np = pytest.importorskip("numpy")
+av = pytest.importorskip("av")
+pytest.importorskip("faster_whisper")
+
+from streaming import SAMPLE_RATE, StreamingTranscriber
+
+SECONDS = 6
+CHUNK_BYTES = 4000
+
+
+def silent_webm(seconds, rate=48000):
+    """Opus-in-webm silence, the way MediaRecorder sends it."""
+    buf = io.BytesIO()
+    with av.open(buf, "w", format="webm") as out:
+        stream = out.add_stream("libopus", rate=rate)
+        stream.layout = "mono"
+        block = rate // 20
+        for _ in range(seconds * 20):
+            frame = av.AudioFrame.from_ndarray(
+                np.zeros((1, block), dtype=np.int16), format="s16", layout="mono"
+            )
+            frame.sample_rate = rate
+            for packet in stream.encode(frame):
+                out.mux(packet)
+        for packet in stream.encode(None):
+            out.mux(packet)
+    return buf.getvalue()
+
+
+class CountingModel:
+
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, audio, **kwargs):
+        self.calls += 1
+        return [], None
+
+
+def test_silence_never_calls_transcribe(tmp_path):
+    data = silent_webm(SECONDS)
+    stream = StreamingTranscriber(str(tmp_path / "live.webm"))
+    model = CountingModel()
+    emitted = []
+
+    try:
+        for i in range(0, len(data), CHUNK_BYTES):
+            stream.append(data[i:i + CHUNK_BYTES])
+            stream.step(model, emitted.append)
+        stream.step(model, emitted.append, final=True)
+    finally:
+        stream.discard()
+
+    assert model.calls == 0
+    assert emitted == []
+    # the silence was still consumed, not left pending
+    assert stream.committed >= (SECONDS - 0.1) * SAMPLE_RATE
+    assert not len(stream.pending)
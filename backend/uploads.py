@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import storage
+from ingest import Upload, UploadTooLarge
+
+UPLOADING = "uploading"
+TRANSCRIBING = "transcribing"
+FAILED = "failed"
+
+
+class ChunkRejected(Exception):
+    pass
+
+
+class ResumableUploads:
+    """
+    Resumable, chunked uploads for long recordings.
+
+    An upload is a sessions row in status `uploading` plus a directory under
+    `root` holding a manifest and one file per received chunk. Clients PUT
+    numbered chunks with a sha256 each, ask which chunks arrived after a
+    dropped connection, and only re-send the missing ones. Completing the
+    upload joins the chunks into a spool file for the normal transcription
+    path and moves the row to `transcribing`.
+
+    Uploads not completed within `ttl` seconds are removed, directory and
+    row, by a background sweep.
+    """
+
+    def __init__(
+        self,
+        root,
+        spool_dir,
+        max_bytes,
+        chunk_size=1024 * 1024,
+        max_chunk_size=8 * 1024 * 1024,
+        ttl=24 * 3600,
+        sweep_interval=600
+    ):
+        self.root = root
+        self.spool_dir = spool_dir
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+
+        self.stopping = threading.Event()
+        self.thread = None
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        os.makedirs(self.root, exist_ok=True)
+        self.sweep()
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="upload-sweeper", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def _run(self):
+        while not self.stopping.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print("Upload sweep failed:", e)
+
+    # ---------- protocol ----------
+
+    def create(self, patient_id, user_email, size, chunk_size=None, quality=None):
+        chunk_size = min(chunk_size or self.chunk_size, self.max_chunk_size)
+        if size <= 0 or chunk_size <= 0:
+            raise ChunkRejected("size and chunk_size must be positive")
+        if self.max_bytes and size > self.max_bytes:
+            raise UploadTooLarge(size)
+
+        sid = str(uuid.uuid4())
+        now = int(time.time())
+        manifest = {
+            "id": sid,
+            "patient_id": patient_id,
+            "user": user_email,
+            "quality": quality,
+            "size": size,
+            "chunk_size": chunk_size,
+            "chunks": -(-size // chunk_size),
+            "created": now,
+            "expires_at": now + self.ttl
+        }
+
+        os.makedirs(self._dir(sid))
+        self._write_manifest(manifest)
+
+        storage.execute(
+            "INSERT INTO sessions (id, patient_id, transcript, summary, timestamp, status) "
+            "VALUES (?,?,?,?,?,?)",
+            (sid, patient_id, "", "", now, UPLOADING)
+        )
+        return manifest
+
+    def manifest(self, sid, user_email):
+        path = os.path.join(self._dir(sid), "manifest.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest["user"] != user_email or manifest["expires_at"] < time.time():
+            return None
+        return manifest
+
+    def put_chunk(self, manifest, index, data, checksum):
+        if not 0 <= index < manifest["chunks"]:
+            raise ChunkRejected("chunk index out of range")
+
+        expected = manifest["chunk_size"]
+        if index == manifest["chunks"] - 1:
+            expected = manifest["size"] - index * manifest["chunk_size"]
+        if len(data) != expected:
+            raise ChunkRejected(f"chunk {index} should be {expected} bytes, got {len(data)}")
+
+        if hashlib.sha256(data).hexdigest() != checksum.lower():
+            raise ChunkRejected(f"checksum mismatch for chunk {index}")
+
+        # written under a temp name so a half-written chunk never counts
+        path = self._chunk_path(manifest["id"], index)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def received(self, manifest):
+        return [
+            i for i in range(manifest["chunks"])
+            if os.path.exists(self._chunk_path(manifest["id"], i))
+        ]
+
+    def status(self, manifest):
+        received = self.received(manifest)
+        have = set(received)
+        size, chunk = manifest["size"], manifest["chunk_size"]
+        return {
+            "id": manifest["id"],
+            "size": size,
+            "chunk_size": chunk,
+            "chunks": manifest["chunks"],
+            "received": received,
+            "missing": [i for i in range(manifest["chunks"]) if i not in have],
+            "bytes_received": sum(min(chunk, size - i * chunk) for i in received),
+            "expires_at": manifest["expires_at"]
+        }
+
+    def assemble(self, manifest, checksum=None):
+        """
+        Join the chunks into a spool file and hand it over as an Upload.
+        Moves the session to `transcribing`; returns None if another
+        request already completed this upload. The chunks stay until
+        finish(), so a job that can't be queued can be completed again
+        after release().
+        """
+        sid = manifest["id"]
+        missing = [i for i in range(manifest["chunks"])
+                   if not os.path.exists(self._chunk_path(sid, i))]
+        if missing:
+            raise ChunkRejected(f"missing chunks: {missing[:20]}")
+
+        # the status flip is the claim, so a retried complete can't run twice
+        claimed = storage.execute(
+            "UPDATE sessions SET status=? WHERE id=? AND status=?",
+            (TRANSCRIBING, sid, UPLOADING)
+        ).rowcount
+        if not claimed:
+            return None
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = os.path.join(self.spool_dir, f"{uuid.uuid4().hex}.part")
+        digest = hashlib.sha256()
+        try:
+            with open(path, "wb") as out:
+                for i in range(manifest["chunks"]):
+                    with open(self._chunk_path(sid, i), "rb") as f:
+                        data = f.read()
+                    digest.update(data)
+                    out.write(data)
+
+            if checksum and digest.hexdigest() != checksum.lower():
+                raise ChunkRejected("checksum mismatch for the assembled file")
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            storage.execute(
+                "UPDATE sessions SET status=? WHERE id=?", (UPLOADING, sid)
+            )
+            raise
+
+        return Upload(path, manifest["size"], digest.hexdigest())
+
+    def release(self, sid):
+        """Give back a claim that couldn't be queued; the upload can be completed again."""
+        storage.execute(
+            "UPDATE sessions SET status=? WHERE id=? AND status=?",
+            (UPLOADING, sid, TRANSCRIBING)
+        )
+
+    def fail(self, sid):
+        """The transcription job failed: settle the row now rather than at the next sweep."""
+        storage.execute(
+            "UPDATE sessions SET status=? WHERE id=? AND status=?",
+            (FAILED, sid, TRANSCRIBING)
+        )
+
+    def finish(self, sid):
+        """The job is queued (or answered from cache): the chunks aren't needed any more."""
+        shutil.rmtree(self._dir(sid), ignore_errors=True)
+
+    def abort(self, sid):
+        shutil.rmtree(self._dir(sid), ignore_errors=True)
+        storage.execute(
+            "DELETE FROM sessions WHERE id=? AND status IN (?,?)",
+            (sid, UPLOADING, TRANSCRIBING)
+        )
+
+    # ---------- garbage collection ----------
+
+    def sweep(self):
+        now = time.time()
+        removed = 0
+
+        for name in os.listdir(self.root) if os.path.isdir(self.root) else []:
+            path = os.path.join(self.root, name, "manifest.json")
+            try:
+                with open(path, encoding="utf-8") as f:
+                    expires = json.load(f)["expires_at"]
+            except (OSError, ValueError, KeyError):
+                # no readable manifest: judge by age instead
+                expires = os.path.getmtime(os.path.join(self.root, name)) + self.ttl
+
+            if expires < now:
+                self.abort(name)
+                removed += 1
+
+        # rows whose directory is already gone, and completed uploads whose
+        # transcription never finished (process died mid-job)
+        removed += storage.execute(
+            "DELETE FROM sessions WHERE status IN (?,?) AND timestamp < ?",
+            (UPLOADING, TRANSCRIBING, int(now - self.ttl))
+        ).rowcount
+
+        if removed:
+            print("Expired partial uploads removed:", removed)
+        return removed
+
+    # ---------- internals ----------
+
+    def _dir(self, sid):
+        return os.path.join(self.root, sid)
+
+    def _chunk_path(self, sid, index):
+        return os.path.join(self._dir(sid), f"{index:06d}.chunk")
+
+    def _write_manifest(self, manifest):
+        path = os.path.join(self._dir(manifest["id"]), "manifest.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
@@ -1,7 +1,7 @@
 import { Routes, Route } from "react-router-dom";
 import Reset from "./Reset";
 import { useState, useEffect } from "react";
-import { fetchHistory, fetchAudit } from "./api";
+import { fetchHistory, fetchSession, fetchAudit, logout } from "./api";
 import Recorder from "./components/Recorder";
 import TranscriptCard from "./components/TranscriptCard";
 import HistoryPanel from "./components/HistoryPanel";
@@ -19,6 +19,7 @@ export default function App() {
   const [searchId, setSearchId] = useState("");
   const [refresh, setRefresh] = useState(0);
   const [miniHistory, setMiniHistory] = useState([]);
+  const [miniNext, setMiniNext] = useState(null);
   const [auditLogs, setAuditLogs] = useState([]);
 
   const [email, setEmail] = useState("");
@@ -31,9 +32,18 @@ export default function App() {
 
 
   useEffect(() => {
-  fetchHistory(searchId).then(setMiniHistory);
+  fetchHistory(searchId).then(({ items, next }) => {
+    setMiniHistory(items);
+    setMiniNext(next);
+  });
 }, [searchId, refresh]);
 
+  async function loadMoreMini() {
+    const { items, next } = await fetchHistory(searchId, miniNext);
+    setMiniHistory(prev => [...prev, ...items]);
+    setMiniNext(next);
+  }
+
 useEffect(() => {
   if (tab === "audit") {
     fetch("http://127.0.0.1:8000/audit", {
@@ -58,7 +68,9 @@ useEffect(() => {
 
   const interval = setInterval(async () => {
     try {
-      const res = await fetch(`http://127.0.0.1:8000/summary/${id}`);
+      const res = await fetch(`http://127.0.0.1:8000/summary/${id}`, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
       const data = await res.json();
 
       // IMPORTANT: only stop when summary is a STRING
@@ -77,10 +89,17 @@ useEffect(() => {
 }
 
 
-  function loadHistory(item) {
-    setTranscript(item.transcript);
-    setSummary(item.summary);
-    setStatus("Loaded from history");
+  // list rows are slim; the transcript and summary come with the session
+  async function loadHistory(item) {
+    try {
+      const session = await fetchSession(item.id);
+      setTranscript(session.transcript);
+      setSummary(session.summary);
+      setStatus("Loaded from history");
+    } catch (e) {
+      console.error(e);
+      setStatus("Failed to load session");
+    }
   }
 
 async function handleAuth() {
@@ -247,6 +266,7 @@ return (
       <button
         style={styles.logoutBtn}
         onClick={() => {
+          logout();
           localStorage.removeItem("token");
           setToken(null);
         }}
@@ -292,9 +312,15 @@ return (
               fontSize:13
             }}
           >
-            {item.patient_id} – {item.transcript.slice(0,20)}...
+            {item.patient_id} – {new Date(item.timestamp * 1000).toLocaleString()}
           </div>
         ))}
+
+        {miniNext && (
+          <button onClick={loadMoreMini} style={{ width:"100%", fontSize:12 }}>
+            Load more
+          </button>
+        )}
       </div>
 
     </aside>
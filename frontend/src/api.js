@@ -26,12 +26,28 @@ export async function uploadAudio(blob, pid) {
 
 // ---------- FETCH HISTORY ----------
 
-export async function fetchHistory(pid) {
-  const r = await fetch(`${BASE}/history/${pid}`,{
-  headers: authHeader()
-});
+// One page of sessions (no transcript/summary bodies). `next` is the
+// cursor for the following page, or null on the last one.
+export async function fetchHistory(pid, cursor) {
+  const params = new URLSearchParams();
+  if (cursor) params.set("cursor", cursor);
+  const path = pid ? `/history/${encodeURIComponent(pid)}` : "/history";
+
+  const r = await fetch(`${BASE}${path}?${params}`, {
+    headers: authHeader()
+  });
 
-  if (!r.ok) return [];
+  if (!r.ok) return { items: [], next: null };
+  return { items: await r.json(), next: r.headers.get("X-Next-Cursor") };
+}
+
+// Transcript and summary of one session, loaded when it is opened.
+export async function fetchSession(id) {
+  const r = await fetch(`${BASE}/session/${id}`, {
+    headers: authHeader()
+  });
+
+  if (!r.ok) throw new Error("Failed to load session");
   return r.json();
 }
 
@@ -48,16 +64,27 @@ export async function deleteSession(id) {
 
 export function audioUrl(path) {
   if (!path) return "";
-  const file = path.split("/").pop();
-  return `${BASE}/audio/${file}`;
+  // older sessions store a full path, which may use Windows separators
+  const file = path.split(/[\\/]/).pop();
+  const token = encodeURIComponent(localStorage.getItem("token") || "");
+  return `${BASE}/audio/${file}?token=${token}`;
 }
 
-export async function fetchAllHistory() {
-  const r = await fetch(`${BASE}/history`,{
-  headers: authHeader()
-});
+// ---------- LOGOUT ----------
+
+export async function logout() {
+  try {
+    await fetch(`${BASE}/logout`, {
+      method: "POST",
+      headers: authHeader()
+    });
+  } catch (e) {
+    console.error("Logout failed", e);
+  }
+}
 
-  return r.json();
+export async function fetchAllHistory(cursor) {
+  return fetchHistory("", cursor);
 }
 
 
@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import { fetchAudioList } from "../api.js";
+import { fetchAudioList, audioUrl } from "../api.js";
 
 export default function AudioLibrary() {
   const [files, setFiles] = useState([]);
@@ -16,7 +16,7 @@ export default function AudioLibrary() {
           {f.file}
           <audio
             controls
-            src={`http://127.0.0.1:8000/audio/${f.file}`}
+            src={audioUrl(f.file)}
           />
         </div>
       ))}
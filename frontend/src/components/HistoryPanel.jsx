@@ -1,14 +1,35 @@
-import { deleteSession, audioUrl, fetchHistory } from "../api";
+import { deleteSession, audioUrl, fetchHistory, fetchSession } from "../api";
 import { useEffect, useState } from "react";
 
 export default function HistoryPanel({ pid, refresh, onSelect }) {
   const [items, setItems] = useState([]);
+  const [next, setNext] = useState(null);
+  // id -> full session, fetched when a card is expanded
+  const [details, setDetails] = useState({});
 
   // reusable reload
   function reloadHistory() {
-  fetchHistory(pid).then(setItems);
+  fetchHistory(pid).then(page => {
+    setItems(page.items);
+    setNext(page.next);
+  });
 }
 
+  async function loadMore() {
+    const page = await fetchHistory(pid, next);
+    setItems(prev => [...prev, ...page.items]);
+    setNext(page.next);
+  }
+
+  async function toggleDetails(id) {
+    if (details[id]) {
+      setDetails(({ [id]: _, ...rest }) => rest);
+      return;
+    }
+    const session = await fetchSession(id);
+    setDetails(prev => ({ ...prev, [id]: session }));
+  }
+
   // load on pid change or refresh trigger
   useEffect(() => {
     reloadHistory();
@@ -38,6 +59,8 @@ export default function HistoryPanel({ pid, refresh, onSelect }) {
           >
             <b>{item.patient_id}</b>
 
+            <span>{new Date(item.timestamp * 1000).toLocaleString()} · {item.status}</span>
+
             <button
               onClick={(e) => {
                 e.stopPropagation(); // prevent card click
@@ -55,13 +78,28 @@ export default function HistoryPanel({ pid, refresh, onSelect }) {
             style={{ width: "100%", marginBottom: 8 }}
           />
 
-          <h4>Transcript</h4>
-          <p>{item.transcript}</p>
+          <button
+            onClick={(e) => {
+              e.stopPropagation();
+              toggleDetails(item.id);
+            }}
+          >
+            {details[item.id] ? "Hide transcript" : "Show transcript"}
+          </button>
+
+          {details[item.id] && (
+            <>
+              <h4>Transcript</h4>
+              <p>{details[item.id].transcript}</p>
 
-          <h4>Summary</h4>
-          <p>{item.summary}</p>
+              <h4>Summary</h4>
+              <p>{details[item.id].summary}</p>
+            </>
+          )}
         </div>
       ))}
+
+      {next && <button onClick={loadMore}>Load more</button>}
     </div>
   );
 }
@@ -1,12 +1,12 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, HTTPException
 from faster_whisper import WhisperModel
 import uvicorn
 import sqlite3
 import torch
-import subprocess
 import tempfile
 import os
 import datetime
+from backend.llm import OllamaClient
 
 DB = "notes.db"
 MODEL = "small"
@@ -18,6 +18,11 @@ whisper = WhisperModel(MODEL, device=DEVICE, compute_type=COMPUTE)
 print("Whisper ready.")
 
 app = FastAPI()
+llm = OllamaClient(
+    os.getenv("OLLAMA_URL", "http://127.0.0.1:11434"),
+    model="llama3",
+    timeout=120
+)
 
 # ---- DB ----
 
@@ -40,21 +45,34 @@ init_db()
 
 # ---- API ----
 
+CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "200")) * 1024 * 1024
+
+
 @app.post("/transcribe")
 async def transcribe(file: UploadFile = File(...)):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-        tmp.write(await file.read())
-        tmp.flush()
-        audio_path = tmp.name
-
-    segments, info = whisper.transcribe(audio_path)
-    text = "".join([s.text for s in segments]).strip()
+    # copied in chunks and removed afterwards instead of read whole and leaked.
+    # Closed before Whisper opens it by name: Windows can't reopen an open temp file.
+    tmp = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+    try:
+        with tmp:
+            size = 0
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(413, "Upload too large")
+                tmp.write(chunk)
+
+        segments, info = whisper.transcribe(tmp.name)
+        text = "".join([s.text for s in segments]).strip()
+    finally:
+        os.remove(tmp.name)
 
     return {"transcript": text}
 
 
 @app.post("/summarize")
-async def summarize(payload: dict):
+def summarize(payload: dict):
     text = payload["text"]
 
     prompt = f"""
@@ -65,13 +83,7 @@ Dictation:
 {text}
 """
 
-    result = subprocess.run(
-        ["ollama", "run", "llama3", prompt],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
-
-    summary = result.stdout.decode(errors="ignore").strip()
+    summary = llm.generate(prompt)
     return {"summary": summary}
 
 